@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: single-pass HTMLTextExtractor vs the legacy regex pipeline.
+
+Usage:
+    python scripts/bench_html_extract.py CORPUS_DIR [--repeat 5] [--processes 4]
+    python scripts/bench_html_extract.py --save CORPUS_DIR https://unravel.tech/ ...
+
+CORPUS_DIR holds saved pages (*.html). --save downloads the given URLs into it.
+"""
+
+import argparse
+import re
+import statistics
+import sys
+import time
+from html import unescape
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.app.config import PAGE_TEXT_MAX_CHARS  # noqa: E402
+from src.app.html_text import extract_text, extract_texts  # noqa: E402
+
+
+def legacy_extract(html: str) -> str:
+    """The original regex pipeline, kept verbatim for comparison."""
+    cleaned = re.sub(r"(?is)<(script|style|noscript).*?>.*?</\1>", " ", html)
+    cleaned = re.sub(r"(?is)<[^>]+>", " ", cleaned)
+    cleaned = unescape(cleaned)
+    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    return cleaned
+
+
+def _time_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def save_pages(corpus: Path, urls: list[str]) -> None:
+    import requests
+
+    corpus.mkdir(parents=True, exist_ok=True)
+    for idx, url in enumerate(urls, 1):
+        response = requests.get(url, timeout=20)
+        response.raise_for_status()
+        target = corpus / f"page_{idx:02d}.html"
+        target.write_text(response.text, encoding="utf-8")
+        print(f"saved {url} -> {target} ({len(response.text)} chars)")
+
+
+def run(corpus: Path, repeat: int, processes: int) -> None:
+    pages = sorted(corpus.glob("*.html"))
+    if not pages:
+        raise SystemExit(f"No *.html files in {corpus}")
+    htmls = [page.read_text(encoding="utf-8", errors="replace") for page in pages]
+
+    print(f"{'page':<30} {'bytes':>10} {'legacy_ms':>10} {'full_ms':>10} {'capped_ms':>10}")
+    totals = [0.0, 0.0, 0.0]
+    for page, html in zip(pages, htmls):
+        legacy_ms = _time_ms(lambda: legacy_extract(html)[:PAGE_TEXT_MAX_CHARS], repeat)
+        full_ms = _time_ms(lambda: extract_text(html), repeat)
+        capped_ms = _time_ms(lambda: extract_text(html, PAGE_TEXT_MAX_CHARS), repeat)
+        totals[0] += legacy_ms
+        totals[1] += full_ms
+        totals[2] += capped_ms
+        print(
+            f"{page.name[:30]:<30} {len(html):>10} "
+            f"{legacy_ms:>10.2f} {full_ms:>10.2f} {capped_ms:>10.2f}"
+        )
+    print(f"{'TOTAL':<30} {'':>10} {totals[0]:>10.2f} {totals[1]:>10.2f} {totals[2]:>10.2f}")
+
+    if processes > 1:
+        inline_ms = _time_ms(lambda: extract_texts(htmls), repeat)
+        pooled_ms = _time_ms(lambda: extract_texts(htmls, processes=processes), repeat)
+        print(f"batch inline_ms={inline_ms:.2f} process_pool_ms={pooled_ms:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("corpus", type=Path)
+    parser.add_argument("urls", nargs="*")
+    parser.add_argument("--save", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--processes", type=int, default=0)
+    args = parser.parse_args()
+    if args.save:
+        save_pages(args.corpus, args.urls)
+        return
+    run(args.corpus, args.repeat, args.processes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Offline checks for the deterministic founder pre-extractor.
+
+Usage:
+    python scripts/check_founders.py
+
+Runs founder-shaped evidence through extract_founder_candidates() and
+pick_confident_founder() with the configured LOCAL_FOUNDER_MIN_SCORE and
+exits non-zero on the first case whose outcome differs from the expected.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.app.config import LOCAL_FOUNDER_MIN_SCORE  # noqa: E402
+from src.app.founders import (  # noqa: E402
+    _names_in,
+    extract_founder_candidates,
+    pick_confident_founder,
+)
+
+UNRAVEL = "https://unravel.tech/about"
+
+# (description, passages, expected picked name or None)
+PICK_CASES = [
+    (
+        "single unravel.tech founder line",
+        [{"url": UNRAVEL, "source": "page", "text": "Prajwalit Bhopale, Co-founder"}],
+        "Prajwalit Bhopale",
+    ),
+    (
+        "name and role on separate lines",
+        [{"url": UNRAVEL, "source": "page", "text": "Prajwalit Bhopale\nCo-founder"}],
+        "Prajwalit Bhopale",
+    ),
+    (
+        "job title next to a founder keyword is not a runner-up",
+        [
+            {
+                "url": UNRAVEL,
+                "source": "page",
+                "text": "Prajwalit Bhopale, Co-founder\nProduct Lead - Founder of X",
+            }
+        ],
+        "Prajwalit Bhopale",
+    ),
+    (
+        "single low-priority source stays inconclusive",
+        [
+            {
+                "url": "https://example.com/post",
+                "source": "page",
+                "text": "Prajwalit Bhopale, Co-founder",
+            }
+        ],
+        None,
+    ),
+]
+
+# (text, expected names)
+NAME_CASES = [
+    ("Principal Engineer, CEO office", []),
+    ("Product Lead - Founder of X", []),
+    ("Prajwalit Bhopale\nCo-founder & CEO\nJane Doe\nCTO", ["Prajwalit Bhopale", "Jane Doe"]),
+]
+
+
+def main() -> int:
+    failures = 0
+    for text, expected in NAME_CASES:
+        names = _names_in(text)
+        if names != expected:
+            print(f"FAIL names {text!r}: got {names}, expected {expected}")
+            failures += 1
+    for description, passages, expected in PICK_CASES:
+        picked = pick_confident_founder(
+            extract_founder_candidates(passages), LOCAL_FOUNDER_MIN_SCORE
+        )
+        name = picked["name"] if picked else None
+        if name != expected:
+            print(f"FAIL {description}: got {name!r}, expected {expected!r}")
+            failures += 1
+    total = len(NAME_CASES) + len(PICK_CASES)
+    print(f"{total - failures}/{total} founder checks passed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
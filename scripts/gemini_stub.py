@@ -0,0 +1,218 @@
+"""
+Offline stand-in for the Gemini REST API.
+
+Usage:
+    python scripts/gemini_stub.py --port 8089
+    GEMINI_API_BASE=http://127.0.0.1:8089/v1beta GEMINI_API_KEY=stub \\
+        uvicorn src.app.api:app
+
+Implements cachedContents create/get/delete and generateContent /
+streamGenerateContent (alt=sse), with the real API's rules that matter here:
+a cached entry is tied to its model, expires after its ttl, and cannot be
+combined with system_instruction. Answers are canned: founder-extraction
+prompts get founder JSON, JSON-mode calls get a single-call answer, and
+everything else gets an email draft. GET /stats reports requests and request
+body bytes per route, so the upload saved by context caching is visible.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FOUNDER = "Prajwalit Bhopale"
+DRAFT = (
+    "To: prajwalit@unravel.tech\n"
+    "Subject: Apply with DSPy: Why\n"
+    "Body:\n"
+    "Hi Prajwalit,\n\n"
+    "I would love to join Unravel as an SDE-1.\n\n"
+    "Best regards,\n"
+    "Applicant\n"
+    "Attachment: resume.pdf"
+)
+
+_lock = threading.Lock()
+_caches: dict[str, dict] = {}
+_stats: dict[str, dict[str, int]] = {}
+
+
+def _record(route: str, body_bytes: int) -> None:
+    with _lock:
+        stats = _stats.setdefault(route, {"requests": 0, "body_bytes": 0})
+        stats["requests"] += 1
+        stats["body_bytes"] += body_bytes
+
+
+def _text_of(content: dict | None) -> str:
+    return "\n".join(part.get("text", "") for part in (content or {}).get("parts", []))
+
+
+def _answer(system_prompt: str, generation_config: dict) -> str:
+    if generation_config.get("responseMimeType") == "application/json":
+        return json.dumps(
+            {
+                "founders": [{"name": FOUNDER, "source_url": "https://unravel.tech/"}],
+                "target_founder": FOUNDER,
+                "target_source_url": "https://unravel.tech/",
+                "confidence": "high",
+                "body": "Hi Prajwalit,\n\nI would love to join Unravel.\n\nBest regards,",
+            }
+        )
+    if "target_founder" in system_prompt:
+        return json.dumps(
+            {
+                "founders": [{"name": FOUNDER, "source_url": "https://unravel.tech/"}],
+                "target_founder": FOUNDER,
+                "target_source_url": "https://unravel.tech/",
+                "confidence": "high",
+                "notes": "stub",
+            }
+        )
+    return DRAFT
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:  # noqa: A002
+        pass
+
+    def _send_json(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send_json(status, {"error": {"code": status, "message": message}})
+
+    def _live_cache(self, name: str) -> dict | None:
+        with _lock:
+            entry = _caches.get(name)
+            if entry and entry["expires_at"] < time.time():
+                del _caches[name]
+                entry = None
+        return entry
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/stats":
+            with _lock:
+                self._send_json(200, {"routes": _stats, "live_caches": len(_caches)})
+            return
+        match = re.fullmatch(r"/v1beta/(cachedContents/[\w-]+)", path)
+        entry = self._live_cache(match.group(1)) if match else None
+        if not entry:
+            self._error(404, "Not found")
+            return
+        self._send_json(200, {"name": match.group(1), "model": entry["model"]})
+
+    def do_DELETE(self) -> None:
+        path = self.path.split("?", 1)[0]
+        match = re.fullmatch(r"/v1beta/(cachedContents/[\w-]+)", path)
+        with _lock:
+            found = bool(match) and _caches.pop(match.group(1), None) is not None
+        if found:
+            self._send_json(200, {})
+        else:
+            self._error(404, "Not found")
+
+    def do_POST(self) -> None:
+        path, _, query = self.path.partition("?")
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            payload = json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            self._error(400, "Invalid JSON payload")
+            return
+
+        if path == "/v1beta/cachedContents":
+            _record("cachedContents.create", len(raw))
+            ttl = float(str(payload.get("ttl") or "3600s").rstrip("s"))
+            name = f"cachedContents/{uuid.uuid4().hex[:12]}"
+            with _lock:
+                _caches[name] = {
+                    "model": payload.get("model", ""),
+                    "system": _text_of(payload.get("systemInstruction")),
+                    "expires_at": time.time() + ttl,
+                }
+            self._send_json(200, {"name": name, "model": payload.get("model", "")})
+            return
+
+        match = re.fullmatch(
+            r"/v1beta/models/([\w.-]+):(generateContent|streamGenerateContent)", path
+        )
+        if not match:
+            self._error(404, "Not found")
+            return
+        model, method = match.groups()
+        _record(method, len(raw))
+
+        system_prompt = _text_of(payload.get("system_instruction"))
+        cached_tokens = 0
+        if payload.get("cachedContent"):
+            if payload.get("system_instruction"):
+                self._error(
+                    400,
+                    "CachedContent can not be used with GenerateContent request "
+                    "setting system_instruction, tools or tool_config.",
+                )
+                return
+            entry = self._live_cache(payload["cachedContent"])
+            if not entry:
+                self._error(403, "CachedContent not found (or permission denied)")
+                return
+            if entry["model"] != f"models/{model}":
+                self._error(400, "Model does not match the cached content model")
+                return
+            system_prompt = entry["system"]
+            cached_tokens = 1024
+
+        text = _answer(system_prompt, payload.get("generationConfig") or {})
+        usage = {
+            "promptTokenCount": len(raw) // 4,
+            "cachedContentTokenCount": cached_tokens,
+        }
+        if method == "generateContent":
+            self._send_json(
+                200,
+                {
+                    "candidates": [{"content": {"parts": [{"text": text}]}}],
+                    "usageMetadata": usage,
+                },
+            )
+            return
+
+        if "alt=sse" not in query:
+            self._error(400, "Only alt=sse streaming is supported by the stub")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for start in range(0, len(text), 24):
+            part = {"text": text[start : start + 24]}
+            chunk = {"candidates": [{"content": {"parts": [part]}}]}
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\r\n\r\n".encode("utf-8"))
+            self.wfile.flush()
+        self.close_connection = True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline Gemini API stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"gemini stub listening on http://{args.host}:{args.port}/v1beta")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
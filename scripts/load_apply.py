@@ -0,0 +1,110 @@
+"""
+Concurrent load test for POST /apply.
+
+Usage:
+    python scripts/load_apply.py --url http://127.0.0.1:8000/apply -n 8
+    python scripts/load_apply.py --selftest --latency 2.0 -n 8
+
+--selftest serves the real FastAPI app in-process with the agent pipeline
+replaced by a fixed sleep, so request overlap can be checked offline. The
+report shows wall time against the serial sum and the peak number of
+requests in flight at once.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PAYLOAD = {
+    "name": "Load Test",
+    "bio": "Load test applicant.",
+    "skills": "Python",
+    "role": "SDE-1",
+    "resume_path": "resume.pdf",
+    "rhyming_word": "Why",
+}
+
+
+def _post(url: str, timeout: float) -> tuple[float, float, int]:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(PAYLOAD).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            status = response.status
+            response.read()
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    return start, time.perf_counter(), status
+
+
+def _peak_overlap(spans: list[tuple[float, float, int]]) -> int:
+    events = sorted(
+        [(start, 1) for start, _, _ in spans] + [(end, -1) for _, end, _ in spans]
+    )
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def _serve_selftest(port: int, latency: float) -> None:
+    import uvicorn
+
+    from src.app import agent
+    from src.app.api import app
+
+    def fake_run_agent(messages: list[dict]) -> str:
+        time.sleep(latency)
+        return "To: x@unravel.tech\nSubject: s\nBody:\nb\nAttachment: resume.pdf"
+
+    agent.run_agent = fake_run_agent
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Concurrent POST /apply load test")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/apply")
+    parser.add_argument("-n", "--requests", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    parser.add_argument("--selftest", action="store_true")
+    parser.add_argument("--latency", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    url = args.url
+    if args.selftest:
+        _serve_selftest(args.port, args.latency)
+        url = f"http://127.0.0.1:{args.port}/apply"
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.requests) as pool:
+        spans = list(pool.map(lambda _: _post(url, args.timeout), range(args.requests)))
+    wall = time.perf_counter() - start
+
+    durations = [end - begin for begin, end, _ in spans]
+    statuses = sorted({status for _, _, status in spans})
+    print(f"requests={len(spans)} statuses={statuses}")
+    print(f"wall_sec={wall:.2f} serial_sum_sec={sum(durations):.2f}")
+    print(f"max_latency_sec={max(durations):.2f} peak_in_flight={_peak_overlap(spans)}")
+
+
+if __name__ == "__main__":
+    main()
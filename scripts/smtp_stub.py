@@ -0,0 +1,124 @@
+"""
+Local SMTP sink for testing the mailer offline.
+
+Usage:
+    python scripts/smtp_stub.py --port 8025
+    SMTP_HOST=127.0.0.1 SMTP_PORT=8025 SMTP_USE_TLS=false \\
+    SMTP_USERNAME=user SMTP_PASSWORD=pass uvicorn src.app.api:app
+
+Speaks enough ESMTP for smtplib (EHLO/HELO, AUTH PLAIN/LOGIN, MAIL, RCPT,
+DATA, RSET, NOOP, QUIT; no STARTTLS) and accepts any credentials. Every
+message is logged with the session it arrived on, so connection reuse is
+visible. --reject and --tempfail refuse recipients containing a substring
+with 550 / 451, and --drop-after N closes each session after N messages to
+exercise reconnects.
+"""
+
+import argparse
+import itertools
+import socketserver
+import threading
+
+_session_ids = itertools.count(1)
+_lock = threading.Lock()
+_totals = {"sessions": 0, "messages": 0}
+
+
+class SmtpHandler(socketserver.StreamRequestHandler):
+    options: argparse.Namespace
+
+    def reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def readline(self) -> str | None:
+        raw = self.rfile.readline()
+        return raw.decode("utf-8", errors="replace").rstrip("\r\n") if raw else None
+
+    def handle(self) -> None:
+        session = next(_session_ids)
+        with _lock:
+            _totals["sessions"] += 1
+        sent = 0
+        recipients: list[str] = []
+        self.reply("220 smtp-stub ready")
+        while (line := self.readline()) is not None:
+            verb = line.split(" ", 1)[0].upper()
+            argument = line[len(verb) :].strip()
+            if verb == "EHLO":
+                self.reply("250-smtp-stub")
+                self.reply("250-AUTH PLAIN LOGIN")
+                self.reply("250 8BITMIME")
+            elif verb == "HELO":
+                self.reply("250 smtp-stub")
+            elif verb == "AUTH":
+                if argument.upper().startswith("LOGIN"):
+                    self.reply("334 VXNlcm5hbWU6")
+                    self.readline()
+                    self.reply("334 UGFzc3dvcmQ6")
+                    self.readline()
+                elif argument.upper() == "PLAIN":
+                    self.reply("334 ")
+                    self.readline()
+                self.reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                address = argument.split(":", 1)[-1].strip("<> ")
+                if self.options.reject and self.options.reject in address:
+                    self.reply("550 5.1.1 Mailbox unavailable")
+                elif self.options.tempfail and self.options.tempfail in address:
+                    self.reply("451 4.3.0 Try again later")
+                else:
+                    recipients.append(address)
+                    self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                subject = ""
+                while (data := self.readline()) not in (None, "."):
+                    if data.lower().startswith("subject:") and not subject:
+                        subject = data[len("subject:") :].strip()
+                sent += 1
+                with _lock:
+                    _totals["messages"] += 1
+                    totals = dict(_totals)
+                print(
+                    f"session={session} message={sent} to={','.join(recipients)} "
+                    f"subject={subject!r} totals={totals}",
+                    flush=True,
+                )
+                self.reply("250 OK queued")
+                if self.options.drop_after and sent >= self.options.drop_after:
+                    return
+            elif verb == "RSET":
+                recipients = []
+                self.reply("250 OK")
+            elif verb == "NOOP":
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--reject", default="", help="550 recipients containing this")
+    parser.add_argument("--tempfail", default="", help="451 recipients containing this")
+    parser.add_argument("--drop-after", type=int, default=0)
+    args = parser.parse_args()
+
+    SmtpHandler.options = args
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer((args.host, args.port), SmtpHandler)
+    server.daemon_threads = True
+    print(f"smtp stub listening on {args.host}:{args.port}", flush=True)
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
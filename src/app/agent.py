@@ -1,8 +1,32 @@
-from .config import GEMINI_MODEL
+import asyncio
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from typing import AsyncIterator, Callable, Iterator
+
+from .config import (
+    AGENT_WORKERS,
+    APPLY_BATCH_CONCURRENCY,
+    EVIDENCE_DRAFT_TOKEN_BUDGET,
+    GEMINI_MODEL,
+    MAIL_SEND_MODE,
+    PIPELINE_MODE,
+)
+from .evidence import pack_evidence
 from .gemini import call_gemini, identify_target_founder
+from .gemini_client import gemini_client
 from .logging_setup import logger
-from .mailer import send_email
-from .search import collect_search_context
+from .mailer import mail_queue, send_email
+from .metrics import pipeline_stage_seconds, rejections_total, retries_total
+from .search import collect_search_evidence
+
+# Blocking pipeline runs execute here so FastAPI handlers never hold the event loop.
+_agent_pool = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix="agent")
+# Bounds concurrent drafting calls from /apply/batch across all batches.
+_draft_pool = ThreadPoolExecutor(
+    max_workers=APPLY_BATCH_CONCURRENCY, thread_name_prefix="batch-draft"
+)
 
 SYSTEM_PROMPT = """
 You are an AI assistant applying for a job at Unravel.tech as per their X post instructions.
@@ -42,73 +66,494 @@ def is_valid_email_draft(content: str) -> bool:
     )
 
 
+BLOCKED_PHRASES = [
+    "knowledge cutoff",
+    "unable to browse",
+    "could not be identified",
+    "recommend calling web_search again",
+]
+
+
+# Streamed output keeps this many trailing characters back until the next
+# chunk, so a blocked phrase split across chunks is caught before forwarding.
+STREAM_HOLDBACK_CHARS = max(len(phrase) for phrase in BLOCKED_PHRASES) - 1
+
+
 def has_disallowed_phrases(content: str) -> bool:
     """Block known failure-text patterns from being returned as final output."""
     lowered = (content or "").lower()
-    blocked = [
-        "knowledge cutoff",
-        "unable to browse",
-        "could not be identified",
-        "recommend calling web_search again",
-    ]
-    return any(phrase in lowered for phrase in blocked)
+    return any(phrase in lowered for phrase in BLOCKED_PHRASES)
 
 
-def run_agent(messages: list[dict]) -> str:
-    """Run search first, then ask Gemini to generate the final email using evidence."""
-    logger.info(
-        "run_agent start model=%s initial_messages=%d", GEMINI_MODEL, len(messages)
+_HEADER_RE = re.compile(
+    r"(?im)^\s*\**(to|subject|body|attachment)\**\s*:\**\s*(.*)$"
+)
+_GREETING_RE = re.compile(r"(?im)^\s*(dear|hi|hello|hey)\b")
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
+# Outcome counters for drafting attempts; see draft_stats().
+_draft_outcomes = {"accepted": 0, "repaired": 0, "reprompted": 0, "failed": 0}
+_draft_outcomes_lock = threading.Lock()
+
+
+def _count_draft_outcome(outcome: str) -> None:
+    with _draft_outcomes_lock:
+        _draft_outcomes[outcome] += 1
+
+
+def draft_stats() -> dict[str, int]:
+    """How drafting attempts ended: accepted as-is, repaired locally, re-prompted."""
+    with _draft_outcomes_lock:
+        return dict(_draft_outcomes)
+
+
+def _applicant_field(user_prompt: str, label: str) -> str:
+    match = re.search(rf"(?im)^- {re.escape(label)}:\s*(.+)$", user_prompt or "")
+    return match.group(1).strip() if match else ""
+
+
+def _strip_blocked_sentences(body: str) -> str:
+    lines = []
+    for line in body.splitlines():
+        sentences = _SENTENCE_SPLIT_RE.split(line)
+        kept = [sentence for sentence in sentences if not has_disallowed_phrases(sentence)]
+        if kept or not line.strip():
+            lines.append(" ".join(kept))
+    return "\n".join(lines).strip()
+
+
+def repair_email_draft(
+    content: str, recipient: str, subject: str, attachment: str
+) -> str | None:
+    """
+    Repair common draft defects locally instead of re-prompting.
+
+    Drops any preamble or code fences around the draft, rebuilds the To/
+    Subject/Attachment headers from the known recipient, subject and resume
+    filename (falling back to headers the model wrote), and removes sentences
+    with blocked phrases. Returns None when no usable body can be found.
+    """
+    text = (content or "").replace("```", "").strip()
+    # name -> (value, line start, value start, line end); first occurrence wins.
+    headers: dict[str, tuple[str, int, int, int]] = {}
+    for match in _HEADER_RE.finditer(text):
+        headers.setdefault(
+            match.group(1).lower(),
+            (match.group(2).strip(), match.start(), match.start(2), match.end()),
+        )
+
+    if "body" in headers:
+        body_start = headers["body"][2]
+    elif "subject" in headers:
+        body_start = headers["subject"][3]
+    else:
+        greeting = _GREETING_RE.search(text)
+        if not greeting:
+            return None
+        body_start = greeting.start()
+    body_end = headers["attachment"][1] if "attachment" in headers else len(text)
+    if body_end <= body_start:
+        body_end = len(text)
+    body = _strip_blocked_sentences(text[body_start:body_end])
+
+    final_subject = subject or headers.get("subject", ("",))[0]
+    final_attachment = attachment or headers.get("attachment", ("",))[0]
+    if not (body and recipient and final_subject and final_attachment):
+        return None
+    repaired = (
+        f"To: {recipient}\n"
+        f"Subject: {final_subject}\n"
+        f"Body:\n{body}\n"
+        f"Attachment: {final_attachment}"
     )
-    user_prompt = messages[-1].get("content", "")
-    search_context = collect_search_context()
-    target_founder = identify_target_founder(search_context)
+    if not is_valid_email_draft(repaired) or has_disallowed_phrases(repaired):
+        return None
+    return repaired
+
+
+INVALID_FORMAT_CORRECTION = (
+    "\n\nYour previous output was invalid. Return ONLY:\n"
+    "To: ...\nSubject: ...\nBody:\n...\nAttachment: ..."
+)
+DISALLOWED_PHRASES_CORRECTION = (
+    "\n\nDo not mention knowledge cutoff or browsing limits. "
+    "Use provided snippets."
+)
+
+
+# Called with a stage name ("search", "founder", "draft", "send") as a
+# pipeline run enters it; used by background jobs to report progress.
+ProgressCallback = Callable[[str], None]
+
+
+def _no_progress(stage: str) -> None:
+    pass
+
+
+def resolve_founder(progress: ProgressCallback | None = None) -> dict[str, str]:
+    """
+    Resolve the target founder from fresh evidence.
+
+    Returns {"name", "email", "source_url", "evidence_prefix"}. The evidence
+    prefix is the same for every applicant, so it is sent as the Gemini
+    context-cache prefix.
+    """
+    progress = progress or _no_progress
+    progress("search")
+    with pipeline_stage_seconds.time(stage="search"):
+        evidence = collect_search_evidence()
+    progress("founder")
+    with pipeline_stage_seconds.time(stage="founder"):
+        target_founder = identify_target_founder(
+            evidence["context"], evidence["passages"]
+        )
     founder_name = target_founder["name"]
     founder_first = founder_name.split()[0].lower()
     founder_email = f"{founder_first}@unravel.tech"
     logger.info(
         "run_agent founder_selected name=%r email=%r", founder_name, founder_email
     )
+    return {
+        "name": founder_name,
+        "email": founder_email,
+        "source_url": target_founder.get("source_url", ""),
+        "evidence_prefix": (
+            "Evidence (for verification only):\n"
+            f"{pack_evidence(evidence['passages'], EVIDENCE_DRAFT_TOKEN_BUDGET)}"
+        ),
+    }
 
-    combined_prompt = (
+
+def _draft_prompt(messages: list[dict], founder: dict[str, str]) -> str:
+    """Per-applicant drafting prompt for an already resolved founder."""
+    user_prompt = messages[-1].get("content", "")
+    return (
         f"{user_prompt}\n\n"
-        f"Selected founder: {founder_name}\n"
-        f"Required recipient email: {founder_email}\n"
-        f"Source URL for selected founder: {target_founder.get('source_url', '')}\n\n"
-        "Evidence (for verification only):\n"
-        f"{search_context}\n\n"
+        f"Selected founder: {founder['name']}\n"
+        f"Required recipient email: {founder['email']}\n"
+        f"Source URL for selected founder: {founder['source_url']}\n\n"
         "Now produce the final answer in the required format. "
         "Do not change the recipient email."
     )
 
+
+def _repair_for(messages: list[dict], founder_email: str, content: str) -> str | None:
+    user_prompt = messages[-1].get("content", "")
+    rhyming_word = _applicant_field(user_prompt, "Rhyming word for subject line")
+    return repair_email_draft(
+        content,
+        recipient=founder_email,
+        subject=f"Apply with DSPy: {rhyming_word}" if rhyming_word else "",
+        attachment=_applicant_field(user_prompt, "Resume filename"),
+    )
+
+
+SINGLE_CALL_SYSTEM_PROMPT = """
+You are an AI assistant applying for a job at Unravel.tech as per their X post instructions.
+
+In one response:
+1. From the provided evidence only, list the founders of Unravel.tech
+   (the AI-focused startup founded in 2023 — NOT Unravel Data or travel apps).
+2. Choose target_founder: the founder whose name contains the letters 'PR'
+   (case-insensitive). Do not guess; report your confidence honestly.
+3. Write a professional cover letter body for the applicant, addressed to that
+   founder, using the applicant details provided.
+
+Never mention model knowledge cutoffs or inability to browse.
+Return JSON matching the response schema.
+""".strip()
+
+SINGLE_CALL_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "founders": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "name": {"type": "STRING"},
+                    "source_url": {"type": "STRING"},
+                },
+            },
+        },
+        "target_founder": {"type": "STRING"},
+        "target_source_url": {"type": "STRING"},
+        "confidence": {"type": "STRING", "enum": ["high", "medium", "low"]},
+        "body": {"type": "STRING"},
+    },
+    "required": ["target_founder", "confidence", "body"],
+}
+
+
+def _run_single_call(messages: list[dict], progress: ProgressCallback) -> str | None:
+    """
+    Extract the founder and draft the body in one structured Gemini call.
+
+    The To/Subject/Body/Attachment draft is rendered locally. Returns None when
+    the structured answer is unusable, so the caller can fall back to the
+    two-step pipeline.
+    """
+    user_prompt = messages[-1].get("content", "")
+    progress("search")
+    with pipeline_stage_seconds.time(stage="search"):
+        evidence = collect_search_evidence()
+    progress("draft")
+    try:
+        with pipeline_stage_seconds.time(stage="draft"):
+            answer = gemini_client.generate_json(
+                user_prompt,
+                SINGLE_CALL_SYSTEM_PROMPT,
+                SINGLE_CALL_SCHEMA,
+                cached_prefix=f"Evidence:\n{evidence['context']}",
+                purpose="single_call",
+            )
+    except Exception:
+        logger.exception("run_agent single_call failed")
+        return None
+    founder_name = str(answer.get("target_founder") or "").strip()
+    body = str(answer.get("body") or "").strip()
+    confidence = str(answer.get("confidence") or "").strip().lower()
+    # Same bar as a cheap extraction tier: anything short of a high-confidence
+    # "pr" match falls back to the two-step pipeline.
+    if not founder_name or "pr" not in founder_name.lower():
+        reason = "no_valid_target"
+    elif not body:
+        reason = "empty_body"
+    elif confidence != "high":
+        reason = "low_confidence"
+    else:
+        reason = ""
+    if reason:
+        logger.warning(
+            "run_agent single_call unusable reason=%s target=%r confidence=%r body_chars=%d",
+            reason,
+            founder_name,
+            confidence,
+            len(body),
+        )
+        rejections_total.inc(component="single_call", reason=reason)
+        return None
+    founder_email = f"{founder_name.split()[0].lower()}@unravel.tech"
+    logger.info(
+        "run_agent single_call founder_selected name=%r email=%r confidence=%s",
+        founder_name,
+        founder_email,
+        confidence,
+    )
+    return _repair_for(messages, founder_email, f"Body:\n{body}")
+
+
+def run_agent(messages: list[dict], progress: ProgressCallback | None = None) -> str:
+    """
+    Run search first, then ask Gemini to generate the final email using evidence.
+
+    `progress` is called with each stage name as the run enters it.
+    """
+    progress = progress or _no_progress
+    logger.info(
+        "run_agent start model=%s initial_messages=%d mode=%s",
+        GEMINI_MODEL,
+        len(messages),
+        PIPELINE_MODE,
+    )
+    if PIPELINE_MODE == "single_call":
+        draft = _run_single_call(messages, progress)
+        if draft:
+            logger.info("run_agent single_call success")
+            _count_draft_outcome("accepted")
+            return draft
+        logger.warning("run_agent single_call fallback=two_step")
+    founder = resolve_founder(progress)
+    progress("draft")
+    return _draft_email(messages, founder)
+
+
+def _draft_email(messages: list[dict], founder: dict[str, str]) -> str:
+    """Draft with Gemini, repairing locally before re-prompting (3 attempts)."""
+    with pipeline_stage_seconds.time(stage="draft"):
+        return _draft_with_retries(messages, founder)
+
+
+def _draft_with_retries(messages: list[dict], founder: dict[str, str]) -> str:
+    combined_prompt = _draft_prompt(messages, founder)
     for attempt in range(1, 4):
         logger.info("run_agent gemini_attempt=%d", attempt)
-        final_content = call_gemini(combined_prompt, system_prompt=SYSTEM_PROMPT)
+        final_content = call_gemini(
+            combined_prompt,
+            system_prompt=SYSTEM_PROMPT,
+            cached_prefix=founder["evidence_prefix"],
+            purpose="draft",
+            attempt=attempt,
+        )
         if not is_valid_email_draft(final_content):
-            logger.warning(
-                "run_agent rejected_response reason=invalid_format attempt=%d",
-                attempt,
-            )
-            combined_prompt += (
-                "\n\nYour previous output was invalid. Return ONLY:\n"
-                "To: ...\nSubject: ...\nBody:\n...\nAttachment: ..."
-            )
-            continue
-        if has_disallowed_phrases(final_content):
-            logger.warning(
-                "run_agent rejected_response reason=disallowed_phrases attempt=%d",
-                attempt,
-            )
-            combined_prompt += (
-                "\n\nDo not mention knowledge cutoff or browsing limits. "
-                "Use provided snippets."
-            )
-            continue
-        logger.info("run_agent success attempt=%d", attempt)
-        return final_content
+            reason = "invalid_format"
+            correction = INVALID_FORMAT_CORRECTION
+        elif has_disallowed_phrases(final_content):
+            reason = "disallowed_phrases"
+            correction = DISALLOWED_PHRASES_CORRECTION
+        else:
+            logger.info("run_agent success attempt=%d", attempt)
+            _count_draft_outcome("accepted")
+            return final_content
 
+        repaired = _repair_for(messages, founder["email"], final_content)
+        if repaired:
+            logger.info("run_agent repaired_response reason=%s attempt=%d", reason, attempt)
+            _count_draft_outcome("repaired")
+            return repaired
+        logger.warning(
+            "run_agent rejected_response reason=%s attempt=%d", reason, attempt
+        )
+        rejections_total.inc(component="draft", reason=reason)
+        if attempt < 3:
+            _count_draft_outcome("reprompted")
+            retries_total.inc(component="draft")
+        combined_prompt += correction
+
+    _count_draft_outcome("failed")
     raise RuntimeError("Gemini did not produce a valid final response.")
 
 
+def draft_batch(
+    batch_messages: list[list[dict]], founder: dict[str, str]
+) -> Iterator[tuple[int, str, str]]:
+    """
+    Draft one email per applicant against a single resolved founder.
+
+    Drafts run concurrently on the bounded draft pool and are yielded as
+    (index, email_draft, error) in completion order; exactly one of
+    email_draft and error is non-empty.
+    """
+    futures = {
+        _draft_pool.submit(_draft_email, messages, founder): index
+        for index, messages in enumerate(batch_messages)
+    }
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield index, future.result(), ""
+            except Exception as exc:
+                logger.warning("draft_batch item=%d failed error=%s", index, exc)
+                yield index, "", f"Agent error: {exc}"
+    finally:
+        # A disconnected client stops the batch; queued drafts are dropped.
+        for future in futures:
+            future.cancel()
+
+
+def stream_agent(messages: list[dict]) -> Iterator[tuple[str, str]]:
+    """
+    Streaming variant of run_agent() yielding (event, data) pairs.
+
+    Events: "token" (draft text as it arrives), "reset" (discard tokens so far;
+    a retry follows), "done" (full validated draft) and "error". Output is held
+    back until the "To:" prefix is seen, so malformed attempts are aborted
+    before anything is forwarded, and the last STREAM_HOLDBACK_CHARS are held
+    until more text arrives, so a blocked phrase never reaches the client.
+    """
+    logger.info("stream_agent start model=%s", GEMINI_MODEL)
+    try:
+        founder = resolve_founder()
+    except Exception as exc:
+        logger.exception("stream_agent failed before drafting")
+        yield "error", f"Agent error: {exc}"
+        return
+
+    with pipeline_stage_seconds.time(stage="draft"):
+        yield from _stream_draft(messages, founder)
+
+
+def _stream_draft(
+    messages: list[dict], founder: dict[str, str]
+) -> Iterator[tuple[str, str]]:
+    combined_prompt = _draft_prompt(messages, founder)
+    for attempt in range(1, 4):
+        logger.info("stream_agent gemini_attempt=%d", attempt)
+        chunks = gemini_client.stream_generate(
+            combined_prompt,
+            SYSTEM_PROMPT,
+            cached_prefix=founder["evidence_prefix"],
+            purpose="draft_stream",
+            attempt=attempt,
+        )
+        text = ""
+        # Offset in text up to which tokens were sent; None until "To:" is seen.
+        sent: int | None = None
+        forwarded = False
+        rejection = ""
+        completed = False
+        try:
+            for chunk in chunks:
+                text += chunk
+                if sent is None:
+                    head = text.lstrip()
+                    if len(head) < len("To:"):
+                        continue
+                    if not head.startswith("To:"):
+                        rejection = "invalid_format"
+                        break
+                    sent = len(text) - len(head)
+                if has_disallowed_phrases(text):
+                    rejection = "disallowed_phrases"
+                    break
+                safe = len(text) - STREAM_HOLDBACK_CHARS
+                if safe > sent:
+                    forwarded = True
+                    yield "token", text[sent:safe]
+                    sent = safe
+            else:
+                completed = True
+                if sent is not None and len(text) > sent:
+                    forwarded = True
+                    yield "token", text[sent:]
+        except Exception as exc:
+            logger.exception("stream_agent stream failed attempt=%d", attempt)
+            yield "error", f"Agent error: {exc}"
+            return
+        finally:
+            chunks.close()
+
+        if not rejection and not is_valid_email_draft(text):
+            rejection = "invalid_format"
+        if not rejection:
+            logger.info("stream_agent success attempt=%d", attempt)
+            _count_draft_outcome("accepted")
+            yield "done", text.strip()
+            return
+        # Only a complete generation can be repaired; aborted ones are partial.
+        repaired = _repair_for(messages, founder["email"], text) if completed else None
+        if repaired:
+            logger.info(
+                "stream_agent repaired_response reason=%s attempt=%d", rejection, attempt
+            )
+            _count_draft_outcome("repaired")
+            if forwarded:
+                yield "reset", rejection
+            yield "done", repaired
+            return
+        rejections_total.inc(component="draft", reason=rejection)
+        if attempt < 3:
+            _count_draft_outcome("reprompted")
+            retries_total.inc(component="draft")
+        logger.warning(
+            "stream_agent rejected_response reason=%s attempt=%d aborted_chars=%d",
+            rejection,
+            attempt,
+            len(text),
+        )
+        if forwarded:
+            yield "reset", rejection
+        combined_prompt += (
+            DISALLOWED_PHRASES_CORRECTION
+            if rejection == "disallowed_phrases"
+            else INVALID_FORMAT_CORRECTION
+        )
+
+    _count_draft_outcome("failed")
+    yield "error", "Gemini did not produce a valid final response."
+
+
 def build_followup_reply_body(
     founder_first_name: str,
     applicant_name: str,
@@ -154,13 +599,23 @@ def run_followup_and_send(
     transparency_note: str = "",
     subject: str = "Re: Application - Agent Code Repository",
     recipient_override: str = "",
+    progress: ProgressCallback | None = None,
 ) -> dict[str, str]:
     """
     Find PR-matching founder at Unravel.tech, compose follow-up message, and send it.
+
+    `progress` is called with each stage name as the run enters it.
     """
+    progress = progress or _no_progress
     logger.info("run_followup_and_send start applicant=%r", applicant_name)
-    search_context = collect_search_context()
-    target_founder = identify_target_founder(search_context)
+    progress("search")
+    with pipeline_stage_seconds.time(stage="search"):
+        evidence = collect_search_evidence()
+    progress("founder")
+    with pipeline_stage_seconds.time(stage="founder"):
+        target_founder = identify_target_founder(
+            evidence["context"], evidence["passages"]
+        )
     founder_name = target_founder["name"]
     founder_first = founder_name.split()[0]
     founder_email = f"{founder_first.lower()}@unravel.tech"
@@ -182,11 +637,18 @@ def run_followup_and_send(
 
     sender_clean = (sender_email or "").strip()
     body_with_sender = f"{body}\nEmail: {sender_clean}\n"
-    delivery = send_email(
-        to_email=recipient_email,
-        subject=(subject or "").strip() or "Re: Application - Agent Code Repository",
-        body=body_with_sender,
-    )
+    progress("send")
+    mail = {
+        "to_email": recipient_email,
+        "subject": (subject or "").strip() or "Re: Application - Agent Code Repository",
+        "body": body_with_sender,
+    }
+    # In queue mode delivery happens in the background; poll GET /mail/{id}.
+    with pipeline_stage_seconds.time(stage="send"):
+        if MAIL_SEND_MODE == "queue":
+            delivery = mail_queue.enqueue(**mail)
+        else:
+            delivery = {**send_email(**mail), "delivery_id": "", "status": "sent"}
     return {
         "founder_name": founder_name,
         "founder_email": founder_email,
@@ -194,4 +656,50 @@ def run_followup_and_send(
         "subject": delivery["subject"],
         "from_email": delivery["from_email"],
         "body": body_with_sender,
+        "delivery_id": delivery["delivery_id"],
+        "delivery_status": delivery["status"],
     }
+
+
+async def run_agent_async(messages: list[dict]) -> str:
+    """Run run_agent() on the agent pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_agent_pool, run_agent, messages)
+
+
+async def stream_agent_async(messages: list[dict]) -> AsyncIterator[tuple[str, str]]:
+    """
+    Drive stream_agent() on the agent pool, one event per worker step.
+
+    If the consumer stops early (client disconnect), the generator is closed
+    on the pool once any in-flight step has finished, which aborts the
+    Gemini stream.
+    """
+    events = stream_agent(messages)
+    pending = None
+    try:
+        while True:
+            pending = _agent_pool.submit(next, events, None)
+            event = await asyncio.wrap_future(pending)
+            if event is None:
+                return
+            yield event
+    finally:
+        if pending is None:
+            events.close()
+        else:
+            pending.add_done_callback(lambda _: _agent_pool.submit(events.close))
+
+
+async def resolve_founder_async() -> dict[str, str]:
+    """Run resolve_founder() on the agent pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_agent_pool, resolve_founder)
+
+
+async def run_followup_and_send_async(**kwargs) -> dict[str, str]:
+    """Run run_followup_and_send(), including SMTP delivery, off the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _agent_pool, partial(run_followup_and_send, **kwargs)
+    )
@@ -1,26 +1,45 @@
-from fastapi import Body, FastAPI, HTTPException
+import json
 
-from .agent import SYSTEM_PROMPT, run_agent, run_followup_and_send
+from fastapi import Body, FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+from .agent import (
+    SYSTEM_PROMPT,
+    draft_batch,
+    draft_stats,
+    resolve_founder_async,
+    run_agent,
+    run_agent_async,
+    run_followup_and_send,
+    run_followup_and_send_async,
+    stream_agent_async,
+)
+from .config import APPLY_BATCH_MAX_ITEMS
+from .fetcher import page_cache
+from .gemini import (
+    cascade_stats,
+    founder_cache,
+    founder_flight,
+    invalidate_founder_cache,
+)
+from .gemini_client import gemini_client
+from .jobs import FAILED, SUCCEEDED, IdempotencyConflict, JobQueueFull, job_queue
 from .logging_setup import logger
+from .mailer import mail_queue, smtp_pool
+from .metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry as metrics_registry
+from .search import (
+    evidence_flight,
+    provider_registry,
+    query_plan_stats,
+    search_cache,
+    search_flight,
+)
 
 app = FastAPI(title="Job Application Agent (Gemini)")
 
 
-@app.post("/apply")
-async def apply_job(details: dict = Body(...)):
-    """
-    POST /apply
-    Body (JSON, all fields optional):
-    {
-        "name": "Mainak Mukherjee",
-        "bio": "...",
-        "skills": "...",
-        "role": "SDE-1",
-        "resume_path": "resume.pdf",
-        "rhyming_word": "Why"
-    }
-    """
-    logger.info("POST /apply request received keys=%s", sorted(details.keys()))
+def _build_apply_messages(details: dict) -> list[dict]:
+    """Turn /apply applicant details (all optional) into agent messages."""
     name = details.get("name", "Mainak Mukherjee")
     bio = details.get(
         "bio",
@@ -48,14 +67,51 @@ Applicant details:
 Now perform your tasks. Start by searching for Unravel.tech founders.
 """.strip()
 
-    messages = [
+    return [
         {"role": "system", "content": SYSTEM_PROMPT},
         {"role": "user", "content": user_prompt},
     ]
 
+
+def _build_followup_kwargs(details: dict) -> dict[str, str]:
+    """Validate /followup/send details into run_followup_and_send() kwargs."""
+    sender_email = details.get("sender_email", "").strip()
+    repo_url = details.get("repo_url", "").strip()
+    if not sender_email:
+        raise HTTPException(status_code=400, detail="sender_email is required.")
+    if not repo_url:
+        raise HTTPException(status_code=400, detail="repo_url is required.")
+    return {
+        "applicant_name": details.get("applicant_name", "Mainak Mukherjee"),
+        "sender_email": sender_email,
+        "repo_url": repo_url,
+        "video_note": details.get("video_note", ""),
+        "transparency_note": details.get("transparency_note", ""),
+        "subject": details.get("subject", "Re: Application - Agent Code Repository"),
+        "recipient_override": details.get("recipient_override", "").strip(),
+    }
+
+
+@app.post("/apply")
+async def apply_job(details: dict = Body(...)):
+    """
+    POST /apply
+    Body (JSON, all fields optional):
+    {
+        "name": "Mainak Mukherjee",
+        "bio": "...",
+        "skills": "...",
+        "role": "SDE-1",
+        "resume_path": "resume.pdf",
+        "rhyming_word": "Why"
+    }
+    """
+    logger.info("POST /apply request received keys=%s", sorted(details.keys()))
+    messages = _build_apply_messages(details)
+
     try:
         logger.info("apply_job invoking run_agent")
-        email_draft = run_agent(messages)
+        email_draft = await run_agent_async(messages)
         logger.info("apply_job completed email_chars=%d", len(email_draft))
         return {"email_draft": email_draft}
     except Exception as exc:
@@ -63,6 +119,67 @@ Now perform your tasks. Start by searching for Unravel.tech founders.
         raise HTTPException(status_code=500, detail=f"Agent error: {exc}") from exc
 
 
+@app.post("/apply/stream")
+async def apply_job_stream(details: dict = Body(...)):
+    """
+    POST /apply/stream
+    Same body as /apply. Responds with Server-Sent Events:
+    "token" (draft text chunks), "reset" (discard tokens, a retry follows),
+    "done" (full validated draft) and "error".
+    """
+    logger.info("POST /apply/stream request received keys=%s", sorted(details.keys()))
+    messages = _build_apply_messages(details)
+
+    async def events():
+        async for event, data in stream_agent_async(messages):
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/apply/batch")
+async def apply_job_batch(items: list[dict] = Body(...)):
+    """
+    POST /apply/batch
+    Body (JSON): a list of /apply detail objects.
+    Search and founder identification run once for the whole batch, then the
+    drafts are generated concurrently. Responds with NDJSON, one line per item
+    as it completes: {"index": i, "email_draft": "..."} or
+    {"index": i, "error": "..."}.
+    """
+    logger.info("POST /apply/batch request received items=%d", len(items))
+    if not items:
+        raise HTTPException(status_code=400, detail="At least one item is required.")
+    if len(items) > APPLY_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {APPLY_BATCH_MAX_ITEMS} items per batch.",
+        )
+    if not all(isinstance(item, dict) for item in items):
+        raise HTTPException(status_code=400, detail="Every item must be an object.")
+    batch_messages = [_build_apply_messages(item) for item in items]
+
+    try:
+        founder = await resolve_founder_async()
+    except Exception as exc:
+        logger.exception("apply_job_batch failed before drafting")
+        raise HTTPException(status_code=500, detail=f"Agent error: {exc}") from exc
+
+    def lines():
+        for index, email_draft, error in draft_batch(batch_messages, founder):
+            if error:
+                result = {"index": index, "error": error}
+            else:
+                result = {"index": index, "email_draft": email_draft}
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.post("/followup/send")
 async def send_followup(details: dict = Body(...)):
     """
@@ -79,29 +196,10 @@ async def send_followup(details: dict = Body(...)):
     }
     """
     logger.info("POST /followup/send request received keys=%s", sorted(details.keys()))
-    applicant_name = details.get("applicant_name", "Mainak Mukherjee")
-    sender_email = details.get("sender_email", "").strip()
-    repo_url = details.get("repo_url", "").strip()
-    recipient_override = details.get("recipient_override", "").strip()
-    video_note = details.get("video_note", "")
-    transparency_note = details.get("transparency_note", "")
-    subject = details.get("subject", "Re: Application - Agent Code Repository")
-
-    if not sender_email:
-        raise HTTPException(status_code=400, detail="sender_email is required.")
-    if not repo_url:
-        raise HTTPException(status_code=400, detail="repo_url is required.")
+    followup_kwargs = _build_followup_kwargs(details)
 
     try:
-        result = run_followup_and_send(
-            applicant_name=applicant_name,
-            sender_email=sender_email,
-            repo_url=repo_url,
-            video_note=video_note,
-            transparency_note=transparency_note,
-            subject=subject,
-            recipient_override=recipient_override,
-        )
+        result = await run_followup_and_send_async(**followup_kwargs)
         logger.info(
             "send_followup completed founder_email=%s subject=%r",
             result["founder_email"],
@@ -111,3 +209,126 @@ async def send_followup(details: dict = Body(...)):
     except Exception as exc:
         logger.exception("send_followup failed")
         raise HTTPException(status_code=500, detail=f"Agent error: {exc}") from exc
+
+
+def _apply_job(messages: list[dict], progress) -> dict[str, str]:
+    return {"email_draft": run_agent(messages, progress=progress)}
+
+
+def _submit_job(
+    kind: str, fn, payload: dict, idempotency_key: str | None
+) -> JSONResponse:
+    try:
+        job, created = job_queue.submit(
+            kind, fn, payload, idempotency_key=(idempotency_key or "").strip()
+        )
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    except JobQueueFull as exc:
+        raise HTTPException(status_code=429, detail=str(exc)) from exc
+    return JSONResponse(status_code=202 if created else 200, content=job)
+
+
+@app.post("/jobs/apply")
+async def submit_apply_job(
+    details: dict = Body(...),
+    idempotency_key: str | None = Header(default=None),
+):
+    """
+    POST /jobs/apply
+    Same body as /apply. Returns 202 with {"job_id", "status", ...} at once;
+    poll GET /jobs/{job_id}. A repeated Idempotency-Key header returns the
+    existing job (200) instead of starting another run.
+    """
+    logger.info("POST /jobs/apply request received keys=%s", sorted(details.keys()))
+    messages = _build_apply_messages(details)
+    return _submit_job("apply", _apply_job, {"messages": messages}, idempotency_key)
+
+
+@app.post("/jobs/followup")
+async def submit_followup_job(
+    details: dict = Body(...),
+    idempotency_key: str | None = Header(default=None),
+):
+    """
+    POST /jobs/followup
+    Same body as /followup/send, run as a background job like /jobs/apply.
+    """
+    logger.info("POST /jobs/followup request received keys=%s", sorted(details.keys()))
+    followup_kwargs = _build_followup_kwargs(details)
+    return _submit_job(
+        "followup", run_followup_and_send, followup_kwargs, idempotency_key
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """GET /jobs/{job_id} - status, current stage and per-stage timings."""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    return job
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    GET /jobs/{job_id}/result - the pipeline result once the job succeeded.
+    409 while it is still queued or running; 500 with the error if it failed.
+    """
+    job = job_queue.get(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job.")
+    if job["status"] == FAILED:
+        raise HTTPException(status_code=500, detail=job["error"])
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}.")
+    return job["result"]
+
+
+@app.get("/mail/{delivery_id}")
+async def get_delivery(delivery_id: str):
+    """GET /mail/{delivery_id} - status of a queued (MAIL_SEND_MODE=queue) email."""
+    delivery = mail_queue.status(delivery_id)
+    if delivery is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired delivery.")
+    return delivery
+
+
+@app.get("/stats")
+async def stats():
+    """GET /stats - cache and pipeline counters."""
+    return {
+        "search_cache": search_cache.stats(),
+        "page_cache": page_cache.stats(),
+        "founder_cache": founder_cache.stats(),
+        "founder_cascade": cascade_stats(),
+        "query_plan": query_plan_stats(),
+        "gemini": gemini_client.stats(),
+        "drafts": draft_stats(),
+        "jobs": job_queue.stats(),
+        "mail": {"smtp_pool": smtp_pool.stats(), "queue": mail_queue.stats()},
+        "singleflight": {
+            flight.name: flight.stats()
+            for flight in (search_flight, evidence_flight, founder_flight)
+        },
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """GET /metrics - stage latency histograms and counters, Prometheus text format."""
+    return Response(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/providers")
+async def providers():
+    """GET /providers - search provider health and circuit breaker state."""
+    return provider_registry.stats()
+
+
+@app.delete("/cache/founder")
+async def clear_founder_cache(fingerprint: str = ""):
+    """DELETE /cache/founder?fingerprint=<sha256> - drop one or all memoized founders."""
+    invalidate_founder_cache(fingerprint.strip())
+    return {"invalidated": fingerprint.strip() or "all"}
@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any
+
+from .logging_setup import logger
+from .metrics import cache_lookups_total
+
+
+class SqliteCache:
+    """
+    Disk-backed JSON key/value cache with TTL and size-bounded LRU eviction.
+
+    Each cache owns one table in a shared SQLite file. Storage errors are
+    logged and treated as misses so a broken cache never fails a request.
+    """
+
+    def __init__(self, name: str, path: str, ttl_sec: float, max_entries: int) -> None:
+        self.name = name
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None, timeout=5
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.name} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Any | None:
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._db()
+                row = db.execute(
+                    f"SELECT value, created_at FROM {self.name} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or now - row[1] > self.ttl_sec:
+                    if row is not None:
+                        db.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+                    self.misses += 1
+                    cache_lookups_total.inc(cache=self.name, result="miss")
+                    return None
+                db.execute(
+                    f"UPDATE {self.name} SET accessed_at = ? WHERE key = ?", (now, key)
+                )
+                self.hits += 1
+                cache_lookups_total.inc(cache=self.name, result="hit")
+                return json.loads(row[0])
+            except Exception:
+                logger.exception("cache=%s get failed", self.name)
+                self.misses += 1
+                cache_lookups_total.inc(cache=self.name, result="miss")
+                return None
+
+    def set(self, key: str, value: Any) -> None:
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._db()
+                db.execute(
+                    f"INSERT OR REPLACE INTO {self.name} "
+                    "(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                (count,) = db.execute(f"SELECT COUNT(*) FROM {self.name}").fetchone()
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    db.execute(
+                        f"DELETE FROM {self.name} WHERE key IN ("
+                        f"SELECT key FROM {self.name} ORDER BY accessed_at LIMIT ?)",
+                        (overflow,),
+                    )
+                    self.evictions += overflow
+            except Exception:
+                logger.exception("cache=%s set failed", self.name)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            try:
+                self._db().execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+            except Exception:
+                logger.exception("cache=%s delete failed", self.name)
+
+    def clear(self) -> None:
+        with self._lock:
+            try:
+                self._db().execute(f"DELETE FROM {self.name}")
+            except Exception:
+                logger.exception("cache=%s clear failed", self.name)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "ttl_sec": self.ttl_sec,
+            "max_entries": self.max_entries,
+        }
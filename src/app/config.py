@@ -1,23 +1,125 @@
 import os
 
+
+def _as_bool(value: str, default: bool) -> bool:
+    normalized = (value or "").strip().lower()
+    if not normalized:
+        return default
+    return normalized in {"1", "true", "yes", "y", "on"}
+
+
+def _as_limits(value: str, default: dict[str, int]) -> dict[str, int]:
+    """Parse "name=limit,name=limit" into a mapping layered over defaults."""
+    limits = dict(default)
+    for item in (value or "").split(","):
+        name, _, raw_limit = item.partition("=")
+        name = name.strip().lower()
+        if not name or not raw_limit.strip():
+            continue
+        try:
+            limits[name] = max(1, int(raw_limit))
+        except ValueError:
+            continue
+    return limits
+
+
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-GEMINI_API_URL = (
-    f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent"
+# Founder-extraction cascade, cheapest first; the last model is the fallback.
+# Duplicates (e.g. GEMINI_MODEL=gemini-2.5-flash-lite) run once.
+GEMINI_EXTRACTION_MODELS = list(
+    dict.fromkeys(
+        model.strip()
+        for model in os.getenv(
+            "GEMINI_EXTRACTION_MODELS", f"gemini-2.5-flash-lite,{GEMINI_MODEL}"
+        ).split(",")
+        if model.strip()
+    )
+) or [GEMINI_MODEL]
+GEMINI_API_BASE = os.getenv(
+    "GEMINI_API_BASE", "https://generativelanguage.googleapis.com/v1beta"
+).rstrip("/")
+GEMINI_TIMEOUT_SEC = float(os.getenv("GEMINI_TIMEOUT_SEC", "45"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+# Client-side pacing; size to the project's Gemini quota.
+GEMINI_REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "5"))
+# Upload system prompt + evidence once as a cachedContents entry and send only
+# the per-request suffix. Prompts under the minimum are sent inline, since the
+# API rejects caches below the model's minimum size.
+GEMINI_CONTEXT_CACHE = _as_bool(os.getenv("GEMINI_CONTEXT_CACHE", "true"), default=True)
+GEMINI_CONTEXT_CACHE_TTL_SEC = int(os.getenv("GEMINI_CONTEXT_CACHE_TTL_SEC", "600"))
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(
+    os.getenv("GEMINI_CONTEXT_CACHE_MIN_TOKENS", "1024")
 )
 SERPER_API_KEY = os.getenv("SERPER_API_KEY", "")
 TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "")
 REQUEST_TIMEOUT_SEC = 20
 MAX_FETCH_PAGES = 8
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# two_step: founder extraction call, then drafting call.
+# single_call: one structured (JSON mode) call returns founder and draft body.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "two_step").strip().lower()
+# Concurrent /apply and /followup/send pipelines per worker process.
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "8"))
+# POST /apply/batch: max applicants per batch and concurrent drafting calls.
+APPLY_BATCH_MAX_ITEMS = int(os.getenv("APPLY_BATCH_MAX_ITEMS", "50"))
+APPLY_BATCH_CONCURRENCY = int(os.getenv("APPLY_BATCH_CONCURRENCY", "4"))
+# Background jobs (/jobs/*): worker threads, max queued+running jobs, and how
+# long finished jobs stay pollable.
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+JOB_RETENTION_SEC = float(os.getenv("JOB_RETENTION_SEC", "3600"))
 
+# Provider fan-out completion policy: all | enough | deadline | sequential
+SEARCH_FANOUT_POLICY = os.getenv("SEARCH_FANOUT_POLICY", "all").strip().lower()
+SEARCH_PROVIDER_DEADLINE_SEC = float(os.getenv("SEARCH_PROVIDER_DEADLINE_SEC", "8"))
+SEARCH_QUERY_WORKERS = int(os.getenv("SEARCH_QUERY_WORKERS", "5"))
+# Max in-flight calls per search provider across all concurrent queries.
+SEARCH_PROVIDER_CONCURRENCY = _as_limits(
+    os.getenv("SEARCH_PROVIDER_CONCURRENCY", ""),
+    default={"serper": 4, "tavily": 4, "ddg": 2},
+)
+# Circuit breaker: consecutive failures that open it, and how long a provider
+# is skipped before a single trial call is let through.
+PROVIDER_BREAKER_FAILURES = int(os.getenv("PROVIDER_BREAKER_FAILURES", "3"))
+PROVIDER_BREAKER_COOLDOWN_SEC = float(os.getenv("PROVIDER_BREAKER_COOLDOWN_SEC", "60"))
+# Recent calls per provider kept for latency, error-rate and yield stats.
+PROVIDER_HEALTH_WINDOW = int(os.getenv("PROVIDER_HEALTH_WINDOW", "50"))
+# Adaptive query plan: run query stages in priority order and stop once the
+# evidence has EVIDENCE_SUFFICIENT_HITS founder-keyword hits on unravel.tech
+# or LinkedIn sources. Each stage fetches at most SEARCH_STAGE_FETCH_PAGES.
+SEARCH_ADAPTIVE_PLAN = _as_bool(os.getenv("SEARCH_ADAPTIVE_PLAN", "true"), default=True)
+EVIDENCE_SUFFICIENT_HITS = int(os.getenv("EVIDENCE_SUFFICIENT_HITS", "4"))
+SEARCH_STAGE_FETCH_PAGES = int(os.getenv("SEARCH_STAGE_FETCH_PAGES", "4"))
 
-def _as_bool(value: str, default: bool) -> bool:
-    normalized = (value or "").strip().lower()
-    if not normalized:
-        return default
-    return normalized in {"1", "true", "yes", "y", "on"}
+FETCH_MAX_CONCURRENCY = int(os.getenv("FETCH_MAX_CONCURRENCY", "8"))
+FETCH_PER_HOST_CONCURRENCY = int(os.getenv("FETCH_PER_HOST_CONCURRENCY", "2"))
+FETCH_STREAMING = _as_bool(os.getenv("FETCH_STREAMING", "true"), default=True)
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(1_500_000)))
+PAGE_TEXT_MAX_CHARS = 6000
+# >1 extracts non-streamed page batches in a process pool of that size.
+HTML_EXTRACT_PROCESSES = int(os.getenv("HTML_EXTRACT_PROCESSES", "0"))
+
+# Approximate token budgets for evidence sent to Gemini (~4 chars per token).
+EVIDENCE_TOKEN_BUDGET = int(os.getenv("EVIDENCE_TOKEN_BUDGET", "3000"))
+EVIDENCE_DRAFT_TOKEN_BUDGET = int(os.getenv("EVIDENCE_DRAFT_TOKEN_BUDGET", "1000"))
+# Skip the Gemini extraction call when local name/title patterns are unambiguous.
+LOCAL_FOUNDER_EXTRACTION = _as_bool(
+    os.getenv("LOCAL_FOUNDER_EXTRACTION", "true"), default=True
+)
+LOCAL_FOUNDER_MIN_SCORE = float(os.getenv("LOCAL_FOUNDER_MIN_SCORE", "4.0"))
 
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", ".cache/agent_cache.sqlite3")
+SEARCH_CACHE_ENABLED = _as_bool(os.getenv("SEARCH_CACHE_ENABLED", "true"), default=True)
+SEARCH_CACHE_TTL_SEC = float(os.getenv("SEARCH_CACHE_TTL_SEC", str(24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+PAGE_CACHE_ENABLED = _as_bool(os.getenv("PAGE_CACHE_ENABLED", "true"), default=True)
+PAGE_CACHE_TTL_SEC = float(os.getenv("PAGE_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv("PAGE_CACHE_MAX_ENTRIES", "500"))
+FOUNDER_CACHE_ENABLED = _as_bool(os.getenv("FOUNDER_CACHE_ENABLED", "true"), default=True)
+FOUNDER_CACHE_TTL_SEC = float(os.getenv("FOUNDER_CACHE_TTL_SEC", str(24 * 3600)))
+FOUNDER_CACHE_MAX_ENTRIES = int(os.getenv("FOUNDER_CACHE_MAX_ENTRIES", "200"))
 
 SMTP_HOST = os.getenv("SMTP_HOST", "")
 SMTP_PORT = int(os.getenv("SMTP_PORT", "587"))
@@ -25,3 +127,19 @@ SMTP_USERNAME = os.getenv("SMTP_USERNAME", "")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "")
 SMTP_FROM_EMAIL = os.getenv("SMTP_FROM_EMAIL", SMTP_USERNAME)
 SMTP_USE_TLS = _as_bool(os.getenv("SMTP_USE_TLS", "true"), default=True)
+SMTP_TIMEOUT_SEC = float(os.getenv("SMTP_TIMEOUT_SEC", "30"))
+# Authenticated SMTP sessions kept open for reuse. Idle sessions are NOOP-checked
+# after SMTP_POOL_CHECK_AFTER_SEC and closed after SMTP_POOL_IDLE_SEC (relays
+# usually drop idle clients after a few minutes).
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_POOL_CHECK_AFTER_SEC = float(os.getenv("SMTP_POOL_CHECK_AFTER_SEC", "15"))
+SMTP_POOL_IDLE_SEC = float(os.getenv("SMTP_POOL_IDLE_SEC", "240"))
+# Retries for transient failures (disconnects, timeouts, 4xx replies).
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+SMTP_RETRY_BASE_SEC = float(os.getenv("SMTP_RETRY_BASE_SEC", "2"))
+# sync: /followup/send waits for delivery. queue: it returns once the message
+# is queued; a background sender delivers it (GET /mail/{delivery_id}).
+MAIL_SEND_MODE = os.getenv("MAIL_SEND_MODE", "sync").strip().lower()
+MAIL_QUEUE_WORKERS = int(os.getenv("MAIL_QUEUE_WORKERS", "1"))
+# Queued messages sent together over one session per drain.
+MAIL_QUEUE_BATCH = int(os.getenv("MAIL_QUEUE_BATCH", "20"))
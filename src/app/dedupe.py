@@ -0,0 +1,126 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track the visit and never change the page.
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "msclkid",
+    "ref_src",
+    "si",
+    "trk",
+    "trkinfo",
+    "yclid",
+}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+SIMHASH_BITS = 64
+# Pages whose SimHash differs in at most this many bits are near-duplicates.
+SIMHASH_MAX_DISTANCE = 6
+
+# Profile pages are mostly shared site boilerplate, so two different people's
+# profiles can look near-identical; they are only deduped on exact content.
+_PROFILE_URL_RE = re.compile(
+    r"^(?:[a-z]+://)?(?:[\w-]+\.)*(?:linkedin\.com/(?:in|company|pub)/"
+    r"|(?:x|twitter)\.com/(?!search|hashtag|i/)[^/?#]+/?(?:$|[?#]))",
+    flags=re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"\w+")
+
+
+def canonical_url(url: str) -> str:
+    """
+    Key that is equal for URL variants that serve the same page.
+
+    Lowercases scheme and host, drops "www.", default ports, fragments,
+    tracking parameters (utm_* and TRACKING_PARAMS) and trailing slashes, and
+    sorts the remaining query parameters. Use it for comparison; the original
+    URL is still the one fetched.
+    """
+    raw = (url or "").strip()
+    if not raw:
+        return ""
+    try:
+        parts = urlsplit(raw)
+        port = parts.port
+    except ValueError:
+        return raw
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[len("www.") :]
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    path = re.sub(r"/{2,}", "/", parts.path).rstrip("/")
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_")
+            and key.lower() not in TRACKING_PARAMS
+        )
+    )
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def _normalized_words(text: str) -> list[str]:
+    return _WORD_RE.findall((text or "").lower())
+
+
+def content_hash(text: str) -> str:
+    """SHA-256 of the text with case and whitespace normalized."""
+    return hashlib.sha256(" ".join(_normalized_words(text)).encode("utf-8")).hexdigest()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word 3-shingles."""
+    words = _normalized_words(text)
+    shingles = (
+        [" ".join(words[i : i + 3]) for i in range(len(words) - 2)]
+        if len(words) >= 3
+        else [" ".join(words)]
+    )
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        digest = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if digest >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(left: int, right: int) -> int:
+    return bin(left ^ right).count("1")
+
+
+class PageDeduper:
+    """
+    Remembers the pages kept so far and rejects exact or near duplicates.
+
+    Feed pages best-first (by source priority) so the copy that survives is
+    the most trusted one. Profile pages (LinkedIn, X) take part only in the
+    exact-content check.
+    """
+
+    def __init__(self, max_distance: int = SIMHASH_MAX_DISTANCE) -> None:
+        self.max_distance = max_distance
+        self._hashes: dict[str, str] = {}
+        self._sketches: list[tuple[int, str]] = []
+
+    def duplicate_of(self, url: str, text: str) -> str:
+        """URL of an already kept duplicate of this page, or "" after keeping it."""
+        digest = content_hash(text)
+        if digest in self._hashes:
+            return self._hashes[digest]
+        if not _PROFILE_URL_RE.match(url or ""):
+            sketch = simhash(text)
+            for other, other_url in self._sketches:
+                if hamming_distance(sketch, other) <= self.max_distance:
+                    return other_url
+            self._sketches.append((sketch, url))
+        self._hashes[digest] = url
+        return ""
@@ -0,0 +1,154 @@
+import re
+
+from .ranking import FOUNDER_KEYWORDS, domain_priority
+from .tokens import estimate_tokens
+
+PASSAGE_CHARS_BEFORE = 200
+PASSAGE_CHARS_AFTER = 500
+PRIORITY_WEIGHT = {0: 3.0, 1: 2.0, 2: 1.0, 3: 0.0}
+
+# Plurals count too ("Our founders", "Co-Founders"), as in the substring check.
+_KEYWORD_RE = re.compile(
+    r"\b(" + "|".join(re.escape(keyword) for keyword in FOUNDER_KEYWORDS) + r")s?\b",
+    flags=re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"\w+")
+
+
+def _keyword_windows(text: str) -> list[tuple[int, int]]:
+    """Windows around every founder keyword hit, with overlaps merged."""
+    windows: list[tuple[int, int]] = []
+    for match in _KEYWORD_RE.finditer(text):
+        start = max(0, match.start() - PASSAGE_CHARS_BEFORE)
+        end = min(len(text), match.end() + PASSAGE_CHARS_AFTER)
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+        else:
+            windows.append((start, end))
+    return windows
+
+
+def score_passage(text: str, url: str, source: str) -> float:
+    """Relevance (founder keywords, Unravel mentions) plus source priority."""
+    keyword_hits = len(_KEYWORD_RE.findall(text))
+    relevance = min(keyword_hits, 5) + (2 if "unravel" in text.lower() else 0)
+    return (
+        relevance * 2
+        + PRIORITY_WEIGHT.get(domain_priority(url), 0.0)
+        + (0.5 if source == "page" else 0.0)
+    )
+
+
+def evidence_sufficiency(passages: list[dict]) -> int:
+    """Founder keyword hits in passages from unravel.tech or LinkedIn."""
+    return sum(
+        len(_KEYWORD_RE.findall(passage["text"]))
+        for passage in passages
+        if passage["priority"] <= 1
+    )
+
+
+def _passage(url: str, title: str, text: str, source: str, order: int) -> dict:
+    return {
+        "url": url,
+        "title": title,
+        "text": text,
+        "source": source,
+        "priority": domain_priority(url),
+        "score": score_passage(text, url, source),
+        "order": order,
+    }
+
+
+def build_passages(
+    search_results: list[dict[str, str]], pages: list[dict[str, str]]
+) -> list[dict]:
+    """
+    Turn search snippets and fetched pages into scored candidate passages.
+
+    Every keyword hit in a page becomes a passage (overlapping windows are
+    merged); pages without a hit contribute their opening text.
+    """
+    passages: list[dict] = []
+    for item in search_results:
+        snippet = " ".join((item.get("snippet") or "").split())
+        if snippet:
+            passages.append(
+                _passage(
+                    item.get("url", ""),
+                    item.get("title", ""),
+                    snippet,
+                    "search",
+                    len(passages),
+                )
+            )
+    for page in pages:
+        text = page.get("text") or ""
+        if not text:
+            continue
+        windows = _keyword_windows(text) or [(0, PASSAGE_CHARS_AFTER)]
+        for start, end in windows:
+            passages.append(
+                _passage(
+                    page.get("url", ""),
+                    page.get("title", ""),
+                    text[start:end].strip(),
+                    "page",
+                    len(passages),
+                )
+            )
+    return passages
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < 3:
+        return {tuple(words)}
+    return {tuple(words[i : i + 3]) for i in range(len(words) - 2)}
+
+
+def _is_near_duplicate(
+    shingles: set[tuple[str, ...]], kept: list[set[tuple[str, ...]]], threshold: float
+) -> bool:
+    for other in kept:
+        union = len(shingles | other)
+        if union and len(shingles & other) / union >= threshold:
+            return True
+    return False
+
+
+def _render_passage(index: int, passage: dict) -> str:
+    return (
+        f"[{index}] ({passage['source']}) {passage['title']}\n"
+        f"URL: {passage['url']}\n"
+        f"{passage['text']}\n"
+    )
+
+
+def pack_evidence(
+    passages: list[dict], token_budget: int, duplicate_threshold: float = 0.7
+) -> str:
+    """
+    Pick the best-scoring, non-duplicate passages that fit token_budget.
+
+    Selection is greedy by score; the chosen passages are rendered by source
+    priority then original order so the prompt is deterministic.
+    """
+    ranked = sorted(passages, key=lambda item: (-item["score"], item["order"]))
+    chosen: list[dict] = []
+    kept_shingles: list[set[tuple[str, ...]]] = []
+    remaining = token_budget
+    for passage in ranked:
+        shingles = _shingles(passage["text"])
+        if _is_near_duplicate(shingles, kept_shingles, duplicate_threshold):
+            continue
+        cost = estimate_tokens(_render_passage(0, passage))
+        if cost > remaining:
+            continue
+        chosen.append(passage)
+        kept_shingles.append(shingles)
+        remaining -= cost
+    chosen.sort(key=lambda item: (item["priority"], item["order"]))
+    return "\n".join(
+        _render_passage(index, passage) for index, passage in enumerate(chosen, 1)
+    )
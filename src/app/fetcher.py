@@ -0,0 +1,268 @@
+import codecs
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .cache import SqliteCache
+from .config import (
+    CACHE_DB_PATH,
+    FETCH_MAX_BYTES,
+    FETCH_MAX_CONCURRENCY,
+    FETCH_PER_HOST_CONCURRENCY,
+    FETCH_STREAMING,
+    HTML_EXTRACT_PROCESSES,
+    PAGE_CACHE_ENABLED,
+    PAGE_CACHE_MAX_ENTRIES,
+    PAGE_CACHE_TTL_SEC,
+    PAGE_TEXT_MAX_CHARS,
+    REQUEST_TIMEOUT_SEC,
+)
+from .dedupe import canonical_url
+from .html_text import HTMLTextExtractor, extract_text, extract_texts
+from .logging_setup import logger
+from .metrics import html_extract_seconds, page_fetch_seconds
+from .ranking import domain_priority, extract_founder_excerpt
+
+try:  # urllib3 only decodes "br" bodies when a brotli package is installed.
+    import brotli  # noqa: F401
+
+    _ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+
+        _ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        _ACCEPT_ENCODING = "gzip, deflate"
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/122.0.0.0 Safari/537.36"
+)
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=FETCH_MAX_CONCURRENCY,
+        pool_maxsize=FETCH_MAX_CONCURRENCY,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5",
+            "Accept-Encoding": _ACCEPT_ENCODING,
+            "Connection": "keep-alive",
+        }
+    )
+    return session
+
+
+# One keep-alive pool for every page fetch; the pool size is the global cap.
+_session = _build_session()
+_fetch_pool = ThreadPoolExecutor(
+    max_workers=FETCH_MAX_CONCURRENCY, thread_name_prefix="page-fetch"
+)
+_host_slots: dict[str, threading.BoundedSemaphore] = {}
+page_cache = SqliteCache(
+    "pages",
+    CACHE_DB_PATH,
+    ttl_sec=PAGE_CACHE_TTL_SEC,
+    max_entries=PAGE_CACHE_MAX_ENTRIES,
+)
+_host_slots_lock = threading.Lock()
+
+
+def _host_slot(url: str) -> threading.BoundedSemaphore:
+    host = urlparse(url).netloc.lower()
+    with _host_slots_lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = threading.BoundedSemaphore(FETCH_PER_HOST_CONCURRENCY)
+            _host_slots[host] = slot
+        return slot
+
+
+def _extract_text_from_html(html: str) -> str:
+    with html_extract_seconds.time(mode="page"):
+        return extract_text(html, max_chars=PAGE_TEXT_MAX_CHARS)
+
+
+STREAM_CHUNK_BYTES = 16 * 1024
+
+
+def _read_html_streaming(response: requests.Response, url: str) -> str:
+    """Feed the body to the extractor chunk by chunk until capped or done."""
+    decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(
+        errors="replace"
+    )
+    extractor = HTMLTextExtractor(max_chars=PAGE_TEXT_MAX_CHARS)
+    received = 0
+    # Extraction interleaves with the download, so only parser time is summed.
+    extract_sec = 0.0
+    for chunk in response.iter_content(chunk_size=STREAM_CHUNK_BYTES):
+        if not chunk:
+            continue
+        received += len(chunk)
+        start = time.perf_counter()
+        extractor.feed(decoder.decode(chunk))
+        extract_sec += time.perf_counter() - start
+        if extractor.done:
+            logger.info("fetch_page_text enough_text url=%s bytes=%d", url, received)
+            break
+        if received >= FETCH_MAX_BYTES:
+            logger.info(
+                "fetch_page_text byte_cap_reached url=%s bytes=%d", url, received
+            )
+            break
+    start = time.perf_counter()
+    extractor.feed(decoder.decode(b"", final=True))
+    extractor.close()
+    extract_sec += time.perf_counter() - start
+    html_extract_seconds.observe(extract_sec, mode="stream")
+    return extractor.text
+
+
+def _download(url: str, stream: bool, cached: dict | None) -> dict[str, str]:
+    """
+    Download one page under its host slot, revalidating any cached copy.
+
+    Returns {"status": "not_modified"} on a 304, {"status": "skipped"} for
+    non-HTML responses, and otherwise {"status": "ok", "body", "etag",
+    "last_modified"} where body is extracted text in streaming mode and raw
+    HTML otherwise.
+    """
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+    with _host_slot(url), _session.get(
+        url, headers=headers, timeout=REQUEST_TIMEOUT_SEC, stream=stream
+    ) as response:
+        if response.status_code == 304 and cached:
+            return {"status": "not_modified"}
+        response.raise_for_status()
+        content_type = (response.headers.get("Content-Type") or "").lower()
+        if "text/html" not in content_type:
+            logger.info(
+                "fetch_page_text skipped_non_html url=%s content_type=%s",
+                url,
+                content_type,
+            )
+            return {"status": "skipped"}
+        body = _read_html_streaming(response, url) if stream else response.text
+        return {
+            "status": "ok",
+            "body": body,
+            "etag": response.headers.get("ETag") or "",
+            "last_modified": response.headers.get("Last-Modified") or "",
+        }
+
+
+def _start_fetch(url: str, stream: bool) -> tuple[dict | None, dict[str, str]]:
+    logger.info("fetch_page_text start url=%s stream=%s", url, stream)
+    cached = page_cache.get(canonical_url(url)) if PAGE_CACHE_ENABLED else None
+    start = time.perf_counter()
+    try:
+        result = _download(url, stream, cached)
+    except Exception:
+        logger.exception("fetch_page_text failed url=%s", url)
+        result = {"status": "failed"}
+    page_fetch_seconds.observe(time.perf_counter() - start, outcome=result["status"])
+    return cached, result
+
+
+def _finish_fetch(
+    url: str, cached: dict | None, result: dict[str, str], text: str
+) -> dict[str, str]:
+    """Build the page record, reusing the cached parse on a 304."""
+    if result["status"] == "not_modified" and cached:
+        logger.info("fetch_page_text not_modified url=%s", url)
+        page_cache.set(canonical_url(url), cached)
+        return {"url": url, "text": cached["text"], "excerpt": cached["excerpt"]}
+    if not text:
+        return {"url": url, "text": "", "excerpt": ""}
+    text = text[:PAGE_TEXT_MAX_CHARS]
+    page = {"url": url, "text": text, "excerpt": extract_founder_excerpt(text)}
+    logger.info("fetch_page_text done url=%s chars=%d", url, len(text))
+    # Pages without validators cannot be revalidated, so they are not cached.
+    if PAGE_CACHE_ENABLED and (result.get("etag") or result.get("last_modified")):
+        page_cache.set(
+            canonical_url(url),
+            {
+                **page,
+                "etag": result.get("etag", ""),
+                "last_modified": result.get("last_modified", ""),
+            },
+        )
+    return page
+
+
+def fetch_page(url: str, stream: bool | None = None) -> dict[str, str]:
+    """
+    Fetch one page and return {"url", "text", "excerpt"}; text is "" if unavailable.
+
+    In streaming mode (default FETCH_STREAMING) non-HTML responses are rejected
+    from the headers alone and the body is read incrementally under a byte cap.
+    Cached pages are revalidated with If-None-Match / If-Modified-Since.
+    """
+    use_stream = FETCH_STREAMING if stream is None else stream
+    cached, result = _start_fetch(url, use_stream)
+    body = result.get("body", "")
+    text = body if use_stream or not body else _extract_text_from_html(body)
+    return _finish_fetch(url, cached, result, text)
+
+
+def fetch_page_text(url: str, stream: bool | None = None) -> str:
+    """Fetch and clean page text. Returns empty string if unavailable."""
+    return fetch_page(url, stream)["text"]
+
+
+def fetch_pages(urls: list[str]) -> list[dict[str, str]]:
+    """
+    Fetch many pages concurrently under the global and per-host caps.
+
+    Results are returned in domain_priority order (stable for ties), one
+    {"url", "text", "excerpt"} entry per distinct canonical URL (the first
+    variant is fetched); failed fetches have empty text.
+    """
+    start = time.perf_counter()
+    ordered: list[str] = []
+    seen: set[str] = set()
+    for url in sorted((url for url in urls if url), key=domain_priority):
+        key = canonical_url(url)
+        if key not in seen:
+            seen.add(key)
+            ordered.append(url)
+    if FETCH_STREAMING:
+        pages = list(_fetch_pool.map(fetch_page, ordered))
+    else:
+        # Download everything first, then extract the batch in one pass
+        # (optionally in a process pool, see HTML_EXTRACT_PROCESSES).
+        started = list(_fetch_pool.map(lambda url: _start_fetch(url, False), ordered))
+        with html_extract_seconds.time(mode="batch"):
+            texts = extract_texts(
+                [result.get("body", "") for _, result in started],
+                max_chars=PAGE_TEXT_MAX_CHARS,
+                processes=HTML_EXTRACT_PROCESSES,
+            )
+        pages = [
+            _finish_fetch(url, cached, result, text)
+            for url, (cached, result), text in zip(ordered, started, texts)
+        ]
+    logger.info(
+        "fetch_pages done urls=%d fetched=%d total_duration_ms=%.1f",
+        len(ordered),
+        sum(1 for page in pages if page["text"]),
+        (time.perf_counter() - start) * 1000,
+    )
+    return pages
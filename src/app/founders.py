@@ -0,0 +1,148 @@
+import re
+
+from .ranking import domain_priority
+
+# Two or three capitalized words, e.g. "Prajwalit Bhopale"; case-sensitive
+# even inside the case-insensitive patterns below.
+_NAME = r"(?-i:([A-Z][a-z]+(?:[ \t]+[A-Z][a-z]+){1,2}))"
+_ROLE = r"(?:co-?\s?founder|founder|ceo|cto)"
+# Extracted text puts each block on its own line, so a name may be followed
+# by its role on the next line. Not the reverse: a role line is usually the
+# end of one person's card, and the next name belongs to someone else.
+_GAP = r"[ \t]*\n?[ \t]*"
+_NAME_THEN_ROLE = re.compile(
+    _NAME
+    + r"(?:"
+    + _GAP
+    + r"(?:,|-|–|—|\||\(|:)"
+    + _GAP
+    + r"|[ \t]*\n[ \t]*)(?:and[ \t]+)?"
+    + _ROLE,
+    flags=re.IGNORECASE,
+)
+_ROLE_THEN_NAME = re.compile(
+    _ROLE + r"s?(?:[ \t]*(?:&|and)[ \t]*(?:ceo|cto))?[ \t]*(?:,|:|-|–|—)?[ \t]*" + _NAME,
+    flags=re.IGNORECASE,
+)
+_FOUNDED_BY = re.compile(
+    r"founded[ \t]+(?:in[ \t]+\d{4}[ \t]+)?by[ \t]+"
+    + _NAME
+    + r"(?:[ \t]*(?:,|and|&)[ \t]*"
+    + _NAME
+    + r")?",
+    flags=re.IGNORECASE,
+)
+
+# Capitalized words that show up next to founder keywords but are not names,
+# including job titles ("Principal Engineer, CEO office").
+_NOT_NAME_WORDS = {
+    "about",
+    "ai",
+    "and",
+    "ceo",
+    "chief",
+    "co",
+    "company",
+    "cto",
+    "data",
+    "designer",
+    "developer",
+    "director",
+    "engineer",
+    "engineering",
+    "executive",
+    "founder",
+    "founders",
+    "head",
+    "inc",
+    "lead",
+    "linkedin",
+    "ltd",
+    "manager",
+    "managing",
+    "meet",
+    "officer",
+    "our",
+    "partner",
+    "president",
+    "principal",
+    "product",
+    "senior",
+    "staff",
+    "team",
+    "tech",
+    "technical",
+    "the",
+    "unravel",
+    "vice",
+}
+DOMAIN_WEIGHT = {0: 3.0, 1: 2.0, 2: 1.0, 3: 0.5}
+SOURCE_WEIGHT = {"page": 1.0, "search": 0.8}
+
+
+def _clean_name(raw: str) -> str:
+    words = raw.split()
+    if len(words) < 2 or any(word.lower() in _NOT_NAME_WORDS for word in words):
+        return ""
+    return " ".join(words)
+
+
+def _names_in(text: str) -> list[str]:
+    names = []
+    for pattern in (_NAME_THEN_ROLE, _ROLE_THEN_NAME, _FOUNDED_BY):
+        for match in pattern.finditer(text):
+            for group in match.groups():
+                name = _clean_name(group or "")
+                if name:
+                    names.append(name)
+    return names
+
+
+def extract_founder_candidates(passages: list[dict]) -> list[dict]:
+    """
+    Score founder names found next to founder keywords in evidence passages.
+
+    Each mention adds its source's domain weight (unravel.tech highest) times
+    a page/snippet factor. Returns candidates sorted by score, highest first.
+    """
+    candidates: dict[str, dict] = {}
+    for passage in passages:
+        url = passage.get("url", "")
+        priority = domain_priority(url)
+        weight = DOMAIN_WEIGHT.get(priority, 0.5) * SOURCE_WEIGHT.get(
+            passage.get("source", ""), 0.8
+        )
+        for name in set(_names_in(passage.get("text", ""))):
+            candidate = candidates.setdefault(
+                name.lower(),
+                {"name": name, "score": 0.0, "urls": [], "best_priority": priority},
+            )
+            candidate["score"] += weight
+            if url and url not in candidate["urls"]:
+                candidate["urls"].append(url)
+            if priority < candidate["best_priority"]:
+                candidate["best_priority"] = priority
+    return sorted(candidates.values(), key=lambda item: -item["score"])
+
+
+def pick_confident_founder(candidates: list[dict], min_score: float) -> dict | None:
+    """
+    Return the "pr" founder when the local evidence is unambiguous.
+
+    Requires the top "pr" candidate to have no other "pr" candidate within
+    half its score, and to be backed by an unravel.tech source or by at
+    least two sources reaching min_score.
+    """
+    matches = [item for item in candidates if "pr" in item["name"].lower()]
+    if not matches:
+        return None
+    top = matches[0]
+    runner_up = matches[1]["score"] if len(matches) > 1 else 0.0
+    if runner_up >= top["score"] / 2:
+        return None
+    if top["best_priority"] != 0 and (
+        top["score"] < min_score or len(top["urls"]) < 2
+    ):
+        return None
+    source_url = min(top["urls"], key=domain_priority) if top["urls"] else ""
+    return {"name": top["name"], "source_url": source_url, "confidence": "high"}
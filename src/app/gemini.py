@@ -1,46 +1,94 @@
+import hashlib
 import json
 import re
+import threading
 import time
 from typing import Any
 
 import requests
 
-from .config import GEMINI_API_KEY, GEMINI_API_URL, GEMINI_MODEL
+from .cache import SqliteCache
+from .config import (
+    CACHE_DB_PATH,
+    FOUNDER_CACHE_ENABLED,
+    FOUNDER_CACHE_MAX_ENTRIES,
+    FOUNDER_CACHE_TTL_SEC,
+    GEMINI_EXTRACTION_MODELS,
+    LOCAL_FOUNDER_EXTRACTION,
+    LOCAL_FOUNDER_MIN_SCORE,
+)
+from .founders import extract_founder_candidates, pick_confident_founder
+from .gemini_client import gemini_client
 from .logging_setup import logger
+from .metrics import rejections_total
+from .singleflight import SingleFlight
 
+founder_flight = SingleFlight("founder")
+founder_cache = SqliteCache(
+    "founders",
+    CACHE_DB_PATH,
+    ttl_sec=FOUNDER_CACHE_TTL_SEC,
+    max_entries=FOUNDER_CACHE_MAX_ENTRIES,
+)
 
-def call_gemini(user_content: str, system_prompt: str) -> str:
-    """Call Gemini generateContent and return text output."""
-    if not GEMINI_API_KEY:
-        raise RuntimeError("GEMINI_API_KEY is not set.")
-
-    payload = {
-        "system_instruction": {"parts": [{"text": system_prompt}]},
-        "contents": [{"role": "user", "parts": [{"text": user_content}]}],
-        "generationConfig": {"temperature": 0.2},
-    }
-    start = time.perf_counter()
-    logger.info("call_gemini start model=%s", GEMINI_MODEL)
-    response = requests.post(
-        GEMINI_API_URL,
-        params={"key": GEMINI_API_KEY},
-        json=payload,
-        timeout=45,
-    )
-    elapsed_ms = (time.perf_counter() - start) * 1000
-    logger.info(
-        "call_gemini status=%d duration_ms=%.1f", response.status_code, elapsed_ms
+
+# Per-model outcomes of the founder-extraction cascade; see cascade_stats().
+_tier_stats: dict[str, dict[str, float]] = {}
+_tier_stats_lock = threading.Lock()
+
+
+def call_gemini(
+    user_content: str,
+    system_prompt: str,
+    model: str | None = None,
+    cached_prefix: str = "",
+    purpose: str = "other",
+    attempt: int = 1,
+) -> str:
+    """
+    Call Gemini generateContent through the shared client and return text output.
+
+    `cached_prefix` (e.g. evidence) precedes user_content and is served from
+    a Gemini context cache when possible. `purpose` and `attempt` label the
+    call in /metrics.
+    """
+    return gemini_client.generate(
+        user_content,
+        system_prompt,
+        model=model,
+        cached_prefix=cached_prefix,
+        purpose=purpose,
+        attempt=attempt,
     )
-    response.raise_for_status()
-    data = response.json()
-    candidates = data.get("candidates") or []
-    if not candidates:
-        raise RuntimeError(f"No Gemini candidates in response: {data}")
-    parts = (candidates[0].get("content") or {}).get("parts") or []
-    text = "\n".join(part.get("text", "") for part in parts if part.get("text")).strip()
-    if not text:
-        raise RuntimeError(f"No text returned by Gemini: {data}")
-    return text
+
+
+def _record_tier(model: str, outcome: str, elapsed_ms: float) -> None:
+    with _tier_stats_lock:
+        stats = _tier_stats.setdefault(
+            model,
+            {
+                "calls": 0,
+                "accepted": 0,
+                "rejected": 0,
+                "invalid_json": 0,
+                "error": 0,
+                "total_ms": 0.0,
+            },
+        )
+        stats["calls"] += 1
+        stats[outcome] += 1
+        stats["total_ms"] += elapsed_ms
+
+
+def cascade_stats() -> dict[str, dict[str, float]]:
+    """Per-tier call counts, hit rate and mean latency for founder extraction."""
+    with _tier_stats_lock:
+        snapshot = {model: dict(stats) for model, stats in _tier_stats.items()}
+    for stats in snapshot.values():
+        calls = stats["calls"] or 1
+        stats["hit_rate"] = round(stats["accepted"] / calls, 4)
+        stats["avg_latency_ms"] = round(stats.pop("total_ms") / calls, 1)
+    return snapshot
 
 
 def _extract_first_json_object(text: str) -> dict[str, Any] | None:
@@ -54,8 +102,65 @@ def _extract_first_json_object(text: str) -> dict[str, Any] | None:
     return parsed if isinstance(parsed, dict) else None
 
 
-def identify_target_founder(evidence_context: str) -> dict[str, str]:
-    """Use Gemini to extract founder candidates and choose the PR match."""
+def evidence_fingerprint(evidence_context: str) -> str:
+    """Stable hash of the evidence, insensitive to case and whitespace layout."""
+    normalized = " ".join((evidence_context or "").lower().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def invalidate_founder_cache(fingerprint: str = "") -> None:
+    """Drop one memoized founder by evidence fingerprint, or all when empty."""
+    if fingerprint:
+        founder_cache.delete(fingerprint)
+    else:
+        founder_cache.clear()
+    logger.info("invalidate_founder_cache fingerprint=%r", fingerprint or "*")
+
+
+def identify_target_founder(
+    evidence_context: str, passages: list[dict] | None = None
+) -> dict[str, str]:
+    """
+    Use Gemini to extract founder candidates and choose the PR match.
+
+    When scored evidence passages are given, a deterministic local pass runs
+    first and an unambiguous "pr" founder is returned without calling Gemini.
+    LLM results are memoized by evidence_fingerprint(), so identical evidence
+    skips the extraction round trip until FOUNDER_CACHE_TTL_SEC expires, and
+    concurrent callers with the same evidence share one in-flight extraction.
+    """
+    if passages and LOCAL_FOUNDER_EXTRACTION:
+        candidates = extract_founder_candidates(passages)
+        local = pick_confident_founder(candidates, LOCAL_FOUNDER_MIN_SCORE)
+        if local:
+            logger.info(
+                "identify_target_founder local_match target=%r source=%r candidates=%d",
+                local["name"],
+                local["source_url"],
+                len(candidates),
+            )
+            return local
+        logger.info(
+            "identify_target_founder local_inconclusive candidates=%s",
+            [(item["name"], round(item["score"], 2)) for item in candidates[:5]],
+        )
+
+    fingerprint = evidence_fingerprint(evidence_context)
+    if FOUNDER_CACHE_ENABLED:
+        cached = founder_cache.get(fingerprint)
+        if cached is not None:
+            logger.info(
+                "identify_target_founder cache_hit target=%r fingerprint=%s",
+                cached.get("name"),
+                fingerprint[:12],
+            )
+            return cached
+    return founder_flight.do(
+        fingerprint, _extract_target_founder, evidence_context, fingerprint
+    )
+
+
+def _extract_target_founder(evidence_context: str, fingerprint: str) -> dict[str, str]:
     extractor_prompt = """
 You are extracting facts from evidence about Unravel.tech.
 Rules:
@@ -74,32 +179,87 @@ Output schema:
 }
 """.strip()
 
-    extraction_input = (
-        "Evidence:\n"
-        f"{evidence_context}\n\n"
-        "Extract founders and select the PR-matching founder."
-    )
+    # Evidence goes in the context cache so retries and tiers reuse it.
+    evidence_prefix = f"Evidence:\n{evidence_context}"
+    extraction_input = "Extract founders and select the PR-matching founder."
 
-    for attempt in range(1, 4):
-        logger.info("identify_target_founder attempt=%d", attempt)
-        raw = call_gemini(extraction_input, system_prompt=extractor_prompt)
-        parsed = _extract_first_json_object(raw)
-        if not parsed:
-            logger.warning("identify_target_founder invalid_json attempt=%d", attempt)
-            continue
-        target = str(parsed.get("target_founder") or "").strip()
-        source_url = str(parsed.get("target_source_url") or "").strip()
-        if target and "pr" in target.lower():
+    # Cheaper tiers get one attempt and must return a high-confidence "pr"
+    # match; the last tier keeps the original three attempts at any confidence.
+    models = GEMINI_EXTRACTION_MODELS
+    for tier, model in enumerate(models, 1):
+        final_tier = tier == len(models)
+        for attempt in range(1, 4 if final_tier else 2):
             logger.info(
-                "identify_target_founder success target=%r source=%r",
+                "identify_target_founder tier=%d model=%s attempt=%d",
+                tier,
+                model,
+                attempt,
+            )
+            start = time.perf_counter()
+            try:
+                raw = call_gemini(
+                    extraction_input,
+                    system_prompt=extractor_prompt,
+                    model=model,
+                    cached_prefix=evidence_prefix,
+                    purpose="founder_extraction",
+                    attempt=attempt,
+                )
+            except (requests.RequestException, RuntimeError) as exc:
+                # A cheaper tier that is unavailable (e.g. 404 for the model)
+                # or answers without text (safety block) escalates; the final
+                # tier's error is the caller's to handle.
+                _record_tier(model, "error", (time.perf_counter() - start) * 1000)
+                if final_tier:
+                    raise
+                logger.warning(
+                    "identify_target_founder tier_error model=%s error=%r", model, exc
+                )
+                break
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            parsed = _extract_first_json_object(raw)
+            if not parsed:
+                _record_tier(model, "invalid_json", elapsed_ms)
+                rejections_total.inc(
+                    component="founder_extraction", reason="invalid_json"
+                )
+                logger.warning(
+                    "identify_target_founder invalid_json model=%s attempt=%d",
+                    model,
+                    attempt,
+                )
+                continue
+            target = str(parsed.get("target_founder") or "").strip()
+            source_url = str(parsed.get("target_source_url") or "").strip()
+            confidence = str(parsed.get("confidence") or "").strip().lower()
+            if target and "pr" in target.lower() and (final_tier or confidence == "high"):
+                _record_tier(model, "accepted", elapsed_ms)
+                logger.info(
+                    "identify_target_founder success model=%s target=%r source=%r "
+                    "confidence=%s",
+                    model,
+                    target,
+                    source_url,
+                    confidence,
+                )
+                founder = {
+                    "name": target,
+                    "source_url": source_url,
+                    "confidence": confidence,
+                }
+                if FOUNDER_CACHE_ENABLED:
+                    founder_cache.set(fingerprint, founder)
+                return founder
+            _record_tier(model, "rejected", elapsed_ms)
+            rejections_total.inc(
+                component="founder_extraction", reason="no_valid_target"
+            )
+            logger.warning(
+                "identify_target_founder no_valid_target model=%s attempt=%d "
+                "target=%r confidence=%s",
+                model,
+                attempt,
                 target,
-                source_url,
+                confidence,
             )
-            return {"name": target, "source_url": source_url}
-        logger.warning(
-            "identify_target_founder no_valid_target attempt=%d target=%r",
-            attempt,
-            target,
-        )
     raise RuntimeError("Could not confidently identify founder containing 'PR'.")
-
@@ -0,0 +1,518 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Iterator
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import (
+    GEMINI_API_BASE,
+    GEMINI_API_KEY,
+    GEMINI_BURST,
+    GEMINI_CONTEXT_CACHE,
+    GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+    GEMINI_CONTEXT_CACHE_TTL_SEC,
+    GEMINI_MAX_RETRIES,
+    GEMINI_MODEL,
+    GEMINI_REQUESTS_PER_MINUTE,
+    GEMINI_TIMEOUT_SEC,
+)
+from .logging_setup import logger
+from .metrics import cache_lookups_total, gemini_request_seconds, retries_total
+from .singleflight import SingleFlight
+from .tokens import estimate_tokens
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+BACKOFF_BASE_SEC = 1.0
+BACKOFF_MAX_SEC = 30.0
+LATENCY_WINDOW = 500
+# Statuses meaning a cachedContents reference is gone (expired or deleted).
+CONTEXT_CACHE_MISS_STATUS = {403, 404}
+# Stop reusing a context cache this long before its server-side expiry.
+CONTEXT_CACHE_MARGIN_SEC = 30
+# After a failed create, send that content inline for this long before retrying.
+CONTEXT_CACHE_FAILURE_SEC = 60
+
+
+class TokenBucket:
+    """
+    Blocking token bucket: `rate` tokens per second, up to `capacity` banked.
+
+    A rate of 0 or less disables pacing.
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Take one token, sleeping until available; returns seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _retry_after_sec(response: requests.Response) -> float | None:
+    """Retry-After in seconds, capped at BACKOFF_MAX_SEC so no worker stalls long."""
+    value = (response.headers.get("Retry-After") or "").strip()
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(BACKOFF_MAX_SEC, max(0.0, delay))
+
+
+def _backoff_sec(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(BACKOFF_MAX_SEC, BACKOFF_BASE_SEC * 2 ** (attempt - 1)))
+
+
+def _text_from_response(data: dict[str, Any]) -> str:
+    candidates = data.get("candidates") or []
+    if not candidates:
+        raise RuntimeError(f"No Gemini candidates in response: {data}")
+    parts = (candidates[0].get("content") or {}).get("parts") or []
+    text = "\n".join(part.get("text", "") for part in parts if part.get("text")).strip()
+    if not text:
+        raise RuntimeError(f"No text returned by Gemini: {data}")
+    return text
+
+
+class GeminiClient:
+    """
+    Shared Gemini REST client.
+
+    One pooled session for all calls, client-side pacing with a token bucket
+    sized to the quota, and retries on 429/5xx and connection errors with
+    jittered exponential backoff that honours Retry-After.
+
+    Calls that pass a `cached_prefix` (typically evidence) upload the system
+    prompt and prefix once as a cachedContents entry and reuse it until
+    `context_cache_ttl_sec` is nearly up; only the suffix is sent per call.
+    """
+
+    def __init__(
+        self,
+        api_key: str = GEMINI_API_KEY,
+        api_base: str = GEMINI_API_BASE,
+        model: str = GEMINI_MODEL,
+        timeout_sec: float = GEMINI_TIMEOUT_SEC,
+        max_retries: int = GEMINI_MAX_RETRIES,
+        requests_per_minute: float = GEMINI_REQUESTS_PER_MINUTE,
+        burst: int = GEMINI_BURST,
+        context_cache: bool = GEMINI_CONTEXT_CACHE,
+        context_cache_ttl_sec: int = GEMINI_CONTEXT_CACHE_TTL_SEC,
+        context_cache_min_tokens: int = GEMINI_CONTEXT_CACHE_MIN_TOKENS,
+    ) -> None:
+        self.api_key = api_key
+        self.api_base = api_base.rstrip("/")
+        self.model = model
+        self.timeout_sec = timeout_sec
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=16))
+        self.session.mount("http://", HTTPAdapter(pool_maxsize=16))
+        self.limiter = TokenBucket(rate=requests_per_minute / 60.0, capacity=burst)
+        self._stats_lock = threading.Lock()
+        self._latencies_ms: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._status_counts: dict[str, int] = {}
+        self._calls = 0
+        self._retries = 0
+        self._throttled_sec = 0.0
+        self.context_cache = context_cache
+        self.context_cache_ttl_sec = context_cache_ttl_sec
+        self.context_cache_min_tokens = context_cache_min_tokens
+        # cache key -> (cachedContents name, monotonic reuse deadline); an
+        # empty name marks a recent failed create.
+        self._contexts: dict[str, tuple[str, float]] = {}
+        self._context_flight = SingleFlight("gemini_context")
+        self._context_stats = {
+            "created": 0,
+            "reused": 0,
+            "create_failed": 0,
+            "expired": 0,
+            "inline": 0,
+            "cached_tokens": 0,
+        }
+
+    def model_url(self, method: str, model: str | None = None) -> str:
+        return f"{self.api_base}/models/{model or self.model}:{method}"
+
+    def _record(
+        self, status: str, elapsed_ms: float, purpose: str, attempt: int
+    ) -> None:
+        with self._stats_lock:
+            self._calls += 1
+            self._status_counts[status] = self._status_counts.get(status, 0) + 1
+            self._latencies_ms.append(elapsed_ms)
+        gemini_request_seconds.observe(
+            elapsed_ms / 1000, purpose=purpose, attempt=attempt, status=status
+        )
+
+    def post(
+        self,
+        url: str,
+        payload: dict[str, Any],
+        stream: bool = False,
+        params: dict[str, str] | None = None,
+        purpose: str = "other",
+        attempt: int = 1,
+    ) -> requests.Response:
+        """
+        POST with pacing and retries; returns the successful response.
+
+        `purpose` and `attempt` (the caller's attempt, not the HTTP retry)
+        label the gemini_request_seconds samples of each request sent.
+        """
+        if not self.api_key:
+            raise RuntimeError("GEMINI_API_KEY is not set.")
+        attempts = self.max_retries + 1
+        for try_number in range(1, attempts + 1):
+            waited = self.limiter.acquire()
+            if waited:
+                with self._stats_lock:
+                    self._throttled_sec += waited
+            start = time.perf_counter()
+            try:
+                response = self.session.post(
+                    url,
+                    params={"key": self.api_key, **(params or {})},
+                    json=payload,
+                    timeout=self.timeout_sec,
+                    stream=stream,
+                )
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self._record(type(exc).__name__, elapsed_ms, purpose, attempt)
+                if try_number == attempts:
+                    raise
+                delay = _backoff_sec(try_number)
+                logger.warning(
+                    "gemini_client error=%s attempt=%d retry_in_sec=%.2f",
+                    type(exc).__name__,
+                    try_number,
+                    delay,
+                )
+            else:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self._record(str(response.status_code), elapsed_ms, purpose, attempt)
+                logger.info(
+                    "call_gemini purpose=%s status=%d duration_ms=%.1f attempt=%d",
+                    purpose,
+                    response.status_code,
+                    elapsed_ms,
+                    try_number,
+                )
+                final_try = try_number == attempts
+                if response.status_code not in RETRYABLE_STATUS or final_try:
+                    response.raise_for_status()
+                    return response
+                delay = _retry_after_sec(response)
+                if delay is None:
+                    delay = _backoff_sec(try_number)
+                response.close()
+                logger.warning(
+                    "gemini_client status=%d attempt=%d retry_in_sec=%.2f",
+                    response.status_code,
+                    try_number,
+                    delay,
+                )
+            with self._stats_lock:
+                self._retries += 1
+            retries_total.inc(component="gemini")
+            time.sleep(delay)
+        raise RuntimeError("unreachable")
+
+    def _count_context(self, key: str, amount: int = 1) -> None:
+        with self._stats_lock:
+            self._context_stats[key] += amount
+
+    def cached_context(
+        self, prefix: str, system_prompt: str, model: str | None = None
+    ) -> str | None:
+        """
+        Name of a live cachedContents entry for (model, system_prompt, prefix).
+
+        Creates the entry on first use; concurrent callers share one upload.
+        Returns None when caching is off, the content is below the minimum
+        size, or creation failed (remembered for CONTEXT_CACHE_FAILURE_SEC), in
+        which case the caller sends it inline.
+        """
+        if not self.context_cache:
+            return None
+        if estimate_tokens(system_prompt + prefix) < self.context_cache_min_tokens:
+            return None
+        model_name = model or self.model
+        key = hashlib.sha256(
+            "\x00".join((model_name, system_prompt, prefix)).encode("utf-8")
+        ).hexdigest()
+        with self._stats_lock:
+            entry = self._contexts.get(key)
+        if entry and entry[1] > time.monotonic():
+            if not entry[0]:
+                return None
+            self._count_context("reused")
+            cache_lookups_total.inc(cache="gemini_context", result="hit")
+            return entry[0]
+        cache_lookups_total.inc(cache="gemini_context", result="miss")
+        return self._context_flight.do(
+            key, self._create_context, key, prefix, system_prompt, model_name
+        )
+
+    def _create_context(
+        self, key: str, prefix: str, system_prompt: str, model: str
+    ) -> str | None:
+        payload = {
+            "model": f"models/{model}",
+            "systemInstruction": {"parts": [{"text": system_prompt}]},
+            "contents": [{"role": "user", "parts": [{"text": prefix}]}],
+            "ttl": f"{self.context_cache_ttl_sec}s",
+        }
+        try:
+            response = self.post(
+                f"{self.api_base}/cachedContents", payload, purpose="context_cache"
+            )
+            name = str(response.json().get("name") or "")
+        except (requests.RequestException, ValueError):
+            name = ""
+        if not name:
+            logger.warning("gemini_client context_cache create_failed model=%s", model)
+            self._count_context("create_failed")
+            with self._stats_lock:
+                self._contexts[key] = ("", time.monotonic() + CONTEXT_CACHE_FAILURE_SEC)
+            return None
+        reuse_until = (
+            time.monotonic() + self.context_cache_ttl_sec - CONTEXT_CACHE_MARGIN_SEC
+        )
+        with self._stats_lock:
+            self._contexts[key] = (name, reuse_until)
+        self._count_context("created")
+        logger.info(
+            "gemini_client context_cache created name=%s model=%s prefix_tokens=%d",
+            name,
+            model,
+            estimate_tokens(prefix),
+        )
+        return name
+
+    def _forget_context(self, name: str) -> None:
+        with self._stats_lock:
+            for key in [key for key, entry in self._contexts.items() if entry[0] == name]:
+                del self._contexts[key]
+        self._count_context("expired")
+        logger.warning("gemini_client context_cache expired name=%s", name)
+
+    @staticmethod
+    def _payload(
+        user_content: str,
+        system_prompt: str,
+        generation_config: dict[str, Any] | None,
+        cached_content: str = "",
+    ) -> dict[str, Any]:
+        payload: dict[str, Any] = {
+            "contents": [{"role": "user", "parts": [{"text": user_content}]}],
+            "generationConfig": generation_config or {"temperature": 0.2},
+        }
+        # The API rejects system_instruction alongside cachedContent; the
+        # cached entry already carries it.
+        if cached_content:
+            payload["cachedContent"] = cached_content
+        else:
+            payload["system_instruction"] = {"parts": [{"text": system_prompt}]}
+        return payload
+
+    def _post_generate(
+        self,
+        method: str,
+        user_content: str,
+        system_prompt: str,
+        model: str | None,
+        generation_config: dict[str, Any] | None,
+        cached_prefix: str,
+        purpose: str,
+        attempt: int,
+        stream: bool = False,
+    ) -> requests.Response:
+        """POST a generate call, by context-cache reference when possible."""
+        url = self.model_url(method, model)
+        params = {"alt": "sse"} if stream else None
+        labels: dict[str, Any] = {"purpose": purpose, "attempt": attempt}
+        if cached_prefix:
+            name = self.cached_context(cached_prefix, system_prompt, model)
+            if name:
+                payload = self._payload(
+                    user_content, system_prompt, generation_config, cached_content=name
+                )
+                try:
+                    return self.post(
+                        url, payload, stream=stream, params=params, **labels
+                    )
+                except requests.HTTPError as exc:
+                    status = exc.response.status_code if exc.response is not None else 0
+                    if status not in CONTEXT_CACHE_MISS_STATUS:
+                        raise
+                    self._forget_context(name)
+            self._count_context("inline")
+            user_content = f"{cached_prefix}\n\n{user_content}"
+        payload = self._payload(user_content, system_prompt, generation_config)
+        return self.post(url, payload, stream=stream, params=params, **labels)
+
+    def generate(
+        self,
+        user_content: str,
+        system_prompt: str,
+        model: str | None = None,
+        generation_config: dict[str, Any] | None = None,
+        cached_prefix: str = "",
+        purpose: str = "other",
+        attempt: int = 1,
+    ) -> str:
+        """
+        Call generateContent and return the text output.
+
+        The prompt is `cached_prefix` followed by `user_content`; the prefix is
+        served from a context cache when one can be used. `purpose` and
+        `attempt` label the call's metrics.
+        """
+        logger.info("call_gemini start model=%s", model or self.model)
+        response = self._post_generate(
+            "generateContent",
+            user_content,
+            system_prompt,
+            model,
+            generation_config,
+            cached_prefix,
+            purpose,
+            attempt,
+        )
+        data = response.json()
+        cached_tokens = (data.get("usageMetadata") or {}).get("cachedContentTokenCount")
+        if cached_tokens:
+            self._count_context("cached_tokens", int(cached_tokens))
+        return _text_from_response(data)
+
+    def generate_json(
+        self,
+        user_content: str,
+        system_prompt: str,
+        response_schema: dict[str, Any],
+        model: str | None = None,
+        cached_prefix: str = "",
+        purpose: str = "other",
+        attempt: int = 1,
+    ) -> dict[str, Any]:
+        """Call generateContent in JSON mode constrained by response_schema."""
+        text = self.generate(
+            user_content,
+            system_prompt,
+            model=model,
+            generation_config={
+                "temperature": 0.2,
+                "responseMimeType": "application/json",
+                "responseSchema": response_schema,
+            },
+            cached_prefix=cached_prefix,
+            purpose=purpose,
+            attempt=attempt,
+        )
+        parsed = json.loads(text)
+        if not isinstance(parsed, dict):
+            raise RuntimeError(f"Gemini JSON output is not an object: {text[:200]}")
+        return parsed
+
+    def stream_generate(
+        self,
+        user_content: str,
+        system_prompt: str,
+        model: str | None = None,
+        generation_config: dict[str, Any] | None = None,
+        cached_prefix: str = "",
+        purpose: str = "other",
+        attempt: int = 1,
+    ) -> Iterator[str]:
+        """
+        Call streamGenerateContent (SSE) and yield text chunks as they arrive.
+
+        Closing the generator early closes the HTTP response, which stops the
+        generation server-side.
+        """
+        logger.info("call_gemini stream start model=%s", model or self.model)
+        response = self._post_generate(
+            "streamGenerateContent",
+            user_content,
+            system_prompt,
+            model,
+            generation_config,
+            cached_prefix,
+            purpose,
+            attempt,
+            stream=True,
+        )
+        with response:
+            # text/event-stream carries no charset, so requests would
+            # otherwise fall back to ISO-8859-1 and mangle non-ASCII text.
+            response.encoding = "utf-8"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:") :].strip())
+                candidates = data.get("candidates") or []
+                if not candidates:
+                    continue
+                parts = (candidates[0].get("content") or {}).get("parts") or []
+                for part in parts:
+                    if part.get("text"):
+                        yield part["text"]
+
+    def stats(self) -> dict[str, Any]:
+        with self._stats_lock:
+            latencies = sorted(self._latencies_ms)
+            status_counts = dict(self._status_counts)
+            calls, retries, throttled = self._calls, self._retries, self._throttled_sec
+            context_cache = {
+                **self._context_stats,
+                "live": sum(1 for name, _ in self._contexts.values() if name),
+            }
+
+        def pct(q: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 1)
+
+        return {
+            "calls": calls,
+            "retries": retries,
+            "status_counts": status_counts,
+            "throttled_sec": round(throttled, 3),
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "max": pct(1.0)},
+            "context_cache": context_cache,
+        }
+
+
+gemini_client = GeminiClient()
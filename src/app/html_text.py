@@ -0,0 +1,173 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
+SKIP_TAGS = {"script", "style", "noscript"}
+BLOCK_TAGS = {
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "br",
+    "dd",
+    "div",
+    "dl",
+    "dt",
+    "figcaption",
+    "figure",
+    "footer",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "header",
+    "hr",
+    "li",
+    "main",
+    "nav",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "table",
+    "td",
+    "th",
+    "title",
+    "tr",
+    "ul",
+}
+
+
+class HTMLTextExtractor(HTMLParser):
+    """
+    Incremental, single-pass HTML-to-text extractor.
+
+    Feed chunks as they arrive; script/style/noscript content is skipped,
+    entities are decoded, whitespace is collapsed, and block elements become
+    line breaks. With max_chars set, `done` flips once enough text is
+    collected, further input is ignored and `text` is cut to max_chars.
+    """
+
+    def __init__(self, max_chars: int | None = None) -> None:
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.done = False
+        self._skip_depth = 0
+        self._blocks: list[str] = []
+        self._pending: list[str] = []
+        # len(self.text) without the pending block, and the raw (uncollapsed)
+        # length of the pending block, kept so feed() never re-joins text.
+        self._text_chars = 0
+        self._pending_chars = 0
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._break_block()
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._break_block()
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip_depth:
+            self._pending.append(data)
+            self._pending_chars += len(data)
+
+    def _break_block(self) -> None:
+        block = " ".join("".join(self._pending).split())
+        self._pending = []
+        self._pending_chars = 0
+        if block:
+            self._text_chars += len(block) + (1 if self._blocks else 0)
+            self._blocks.append(block)
+
+    def _compact_pending(self) -> int:
+        """Collapse whitespace in the pending block; returns its text length."""
+        raw = "".join(self._pending)
+        collapsed = " ".join(raw.split())
+        # Edge whitespace still separates this run from the next data.
+        self._pending = [
+            (" " if raw[:1].isspace() else "")
+            + collapsed
+            + (" " if raw[-1:].isspace() else "")
+        ]
+        self._pending_chars = len(self._pending[0])
+        return len(collapsed)
+
+    def feed(self, data: str) -> None:
+        if self.done:
+            return
+        super().feed(data)
+        if self.max_chars is None:
+            return
+        # The raw pending length is an upper bound; measure exactly only
+        # once it could reach the cap.
+        if self._text_chars + self._pending_chars >= self.max_chars:
+            pending = self._compact_pending()
+            separator = 1 if pending and self._blocks else 0
+            if self._text_chars + separator + pending >= self.max_chars:
+                self.done = True
+
+    def close(self) -> None:
+        if not self.done:
+            super().close()
+        self._break_block()
+
+    @property
+    def text(self) -> str:
+        pending = " ".join("".join(self._pending).split())
+        blocks = self._blocks + [pending] if pending else self._blocks
+        text = "\n".join(blocks)
+        # The chunk that reaches the cap may carry text past it.
+        return text[: self.max_chars] if self.max_chars is not None else text
+
+
+FEED_SLICE_CHARS = 16 * 1024
+
+
+def extract_text(html: str, max_chars: int | None = None) -> str:
+    """Extract readable text from a complete HTML document."""
+    extractor = HTMLTextExtractor(max_chars=max_chars)
+    # Feed in slices so a max_chars limit stops parsing early on large pages.
+    for offset in range(0, len(html), FEED_SLICE_CHARS):
+        extractor.feed(html[offset : offset + FEED_SLICE_CHARS])
+        if extractor.done:
+            break
+    extractor.close()
+    return extractor.text
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _process_pool(processes: int) -> ProcessPoolExecutor:
+    """The shared extraction pool, started on first use and kept for reuse."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=processes)
+        return _pool
+
+
+def extract_texts(
+    htmls: list[str], max_chars: int | None = None, processes: int = 0
+) -> list[str]:
+    """
+    Extract many documents, in input order.
+
+    With processes > 1 and more than one document, extraction runs in a
+    process pool so large batches do not hold the GIL of the caller. The pool
+    is created on first use with `processes` workers and reused afterwards.
+    """
+    if processes <= 1 or len(htmls) < 2:
+        return [extract_text(html, max_chars) for html in htmls]
+    pool = _process_pool(processes)
+    return list(pool.map(extract_text, htmls, [max_chars] * len(htmls)))
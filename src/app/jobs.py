@@ -0,0 +1,181 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from .config import JOB_MAX_PENDING, JOB_RETENTION_SEC, JOB_WORKERS
+from .logging_setup import logger
+from .metrics import rejections_total
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when JOB_MAX_PENDING jobs are already queued or running."""
+
+
+class IdempotencyConflict(ValueError):
+    """Raised when an Idempotency-Key is reused with a different request body."""
+
+
+class Job:
+    """One background pipeline run and its per-stage progress."""
+
+    def __init__(self, kind: str, request_hash: str, idempotency_key: str) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.request_hash = request_hash
+        self.idempotency_key = idempotency_key
+        self.status = QUEUED
+        self.stage = ""
+        # [{"stage", "started_at", "finished_at"}] in the order entered.
+        self.stages: list[dict[str, Any]] = []
+        self.result: Any = None
+        self.error = ""
+        self.created_at = time.time()
+        self.finished_at = 0.0
+
+    def snapshot(self, include_result: bool = False) -> dict[str, Any]:
+        snapshot = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": [dict(stage) for stage in self.stages],
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at or None,
+        }
+        if include_result:
+            snapshot["result"] = self.result
+        return snapshot
+
+
+def _request_hash(payload: dict) -> str:
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+class JobQueue:
+    """
+    Bounded background executor for agent pipeline runs.
+
+    At most `max_pending` jobs may be queued or running; finished jobs are
+    kept for `retention_sec` so their status and result can be polled.
+    Submissions that repeat an Idempotency-Key attach to the existing job.
+    """
+
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        max_pending: int = JOB_MAX_PENDING,
+        retention_sec: float = JOB_RETENTION_SEC,
+    ) -> None:
+        self.max_pending = max_pending
+        self.retention_sec = retention_sec
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs: dict[str, Job] = {}
+        self._by_key: dict[str, str] = {}
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention_sec
+        expired = [
+            job for job in self._jobs.values() if 0 < job.finished_at < cutoff
+        ]
+        for job in expired:
+            del self._jobs[job.id]
+            if self._by_key.get(job.idempotency_key) == job.id:
+                del self._by_key[job.idempotency_key]
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable[..., Any],
+        payload: dict,
+        idempotency_key: str = "",
+    ) -> tuple[dict[str, Any], bool]:
+        """
+        Queue fn(**payload, progress=...) and return (job snapshot, created).
+
+        `created` is False when idempotency_key matched an existing job with
+        the same kind and payload; a different payload raises
+        IdempotencyConflict.
+        """
+        request_hash = _request_hash({"kind": kind, "payload": payload})
+        with self._lock:
+            self._prune()
+            if idempotency_key and idempotency_key in self._by_key:
+                job = self._jobs[self._by_key[idempotency_key]]
+                if job.request_hash != request_hash:
+                    raise IdempotencyConflict(
+                        "Idempotency-Key was already used with a different request."
+                    )
+                logger.info(
+                    "jobs attach job_id=%s idempotency_key=%r", job.id, idempotency_key
+                )
+                return job.snapshot(), False
+            pending = sum(
+                1 for job in self._jobs.values() if job.status in (QUEUED, RUNNING)
+            )
+            if pending >= self.max_pending:
+                rejections_total.inc(component="jobs", reason="queue_full")
+                raise JobQueueFull(f"{pending} jobs are already pending.")
+            job = Job(kind, request_hash, idempotency_key)
+            self._jobs[job.id] = job
+            if idempotency_key:
+                self._by_key[idempotency_key] = job.id
+            snapshot = job.snapshot()
+        logger.info("jobs submit job_id=%s kind=%s", job.id, kind)
+        self._pool.submit(self._run, job, fn, payload)
+        return snapshot, True
+
+    def _enter_stage(self, job: Job, stage: str) -> None:
+        now = time.time()
+        with self._lock:
+            if job.stages and job.stages[-1]["finished_at"] is None:
+                job.stages[-1]["finished_at"] = now
+            job.stage = stage
+            job.stages.append({"stage": stage, "started_at": now, "finished_at": None})
+        logger.info("jobs progress job_id=%s stage=%s", job.id, stage)
+
+    def _run(self, job: Job, fn: Callable[..., Any], payload: dict) -> None:
+        with self._lock:
+            job.status = RUNNING
+        try:
+            result = fn(**payload, progress=lambda stage: self._enter_stage(job, stage))
+        except Exception as exc:
+            logger.exception("jobs failed job_id=%s kind=%s", job.id, job.kind)
+            outcome, result, error = FAILED, None, f"Agent error: {exc}"
+        else:
+            outcome, error = SUCCEEDED, ""
+        with self._lock:
+            now = time.time()
+            if job.stages and job.stages[-1]["finished_at"] is None:
+                job.stages[-1]["finished_at"] = now
+            job.status, job.result, job.error = outcome, result, error
+            job.finished_at = now
+        logger.info("jobs done job_id=%s status=%s", job.id, outcome)
+
+    def get(self, job_id: str, include_result: bool = False) -> dict[str, Any] | None:
+        """Consistent snapshot of a job, or None if unknown or expired."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.snapshot(include_result) if job else None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+
+job_queue = JobQueue()
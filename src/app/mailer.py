@@ -1,19 +1,43 @@
+import queue
+import random
 import smtplib
+import threading
+import time
+import uuid
+from contextlib import contextmanager
 from email.message import EmailMessage
+from typing import Any, Iterator
 
 from .config import (
+    MAIL_QUEUE_BATCH,
+    MAIL_QUEUE_WORKERS,
     SMTP_FROM_EMAIL,
     SMTP_HOST,
+    SMTP_MAX_RETRIES,
     SMTP_PASSWORD,
+    SMTP_POOL_CHECK_AFTER_SEC,
+    SMTP_POOL_IDLE_SEC,
+    SMTP_POOL_SIZE,
     SMTP_PORT,
+    SMTP_RETRY_BASE_SEC,
+    SMTP_TIMEOUT_SEC,
     SMTP_USE_TLS,
     SMTP_USERNAME,
 )
 from .logging_setup import logger
+from .metrics import (
+    rejections_total,
+    retries_total,
+    smtp_connect_seconds,
+    smtp_send_seconds,
+)
 
+RETRY_MAX_SEC = 60.0
+# Finished queued deliveries stay queryable this long.
+DELIVERY_RETENTION_SEC = 3600.0
 
-def send_email(to_email: str, subject: str, body: str) -> dict[str, str]:
-    """Send plain-text email using SMTP settings from environment variables."""
+
+def _build_message(to_email: str, subject: str, body: str) -> EmailMessage:
     if not SMTP_HOST:
         raise RuntimeError("SMTP_HOST is not set.")
 
@@ -30,22 +54,421 @@ def send_email(to_email: str, subject: str, body: str) -> dict[str, str]:
     message["To"] = to_clean
     message["Subject"] = subject
     message.set_content(body)
+    return message
 
-    logger.info(
-        "send_email start smtp_host=%s smtp_port=%d tls=%s to=%s",
-        SMTP_HOST,
-        SMTP_PORT,
-        SMTP_USE_TLS,
-        to_clean,
+
+def _is_transient(exc: BaseException) -> bool:
+    """Disconnects, timeouts and 4xx replies are worth retrying; 5xx are not."""
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in exc.recipients.values())
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, OSError))
+
+
+def _retry_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff."""
+    return random.uniform(
+        0, min(RETRY_MAX_SEC, SMTP_RETRY_BASE_SEC * 2 ** (attempt - 1))
     )
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30) as smtp:
-        smtp.ehlo()
-        if SMTP_USE_TLS:
-            smtp.starttls()
+
+
+class SmtpPool:
+    """
+    Pool of authenticated SMTP sessions (EHLO, STARTTLS and LOGIN done once).
+
+    At most `size` sessions exist at a time. Idle sessions are reused newest
+    first; one idle longer than `check_after_sec` must answer NOOP with 250,
+    and one idle longer than `idle_sec` is closed instead of reused. A session
+    that raised during use is discarded.
+    """
+
+    def __init__(
+        self,
+        size: int = SMTP_POOL_SIZE,
+        check_after_sec: float = SMTP_POOL_CHECK_AFTER_SEC,
+        idle_sec: float = SMTP_POOL_IDLE_SEC,
+        timeout_sec: float = SMTP_TIMEOUT_SEC,
+    ) -> None:
+        self.check_after_sec = check_after_sec
+        self.idle_sec = idle_sec
+        self.timeout_sec = timeout_sec
+        self._slots = threading.BoundedSemaphore(max(1, size))
+        self._lock = threading.Lock()
+        self._idle: list[tuple[smtplib.SMTP, float]] = []
+        self._stats = {
+            "connects": 0,
+            "reused": 0,
+            "health_check_failed": 0,
+            "discarded": 0,
+        }
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    def _connect(self) -> smtplib.SMTP:
+        logger.info(
+            "smtp_pool connect smtp_host=%s smtp_port=%d tls=%s",
+            SMTP_HOST,
+            SMTP_PORT,
+            SMTP_USE_TLS,
+        )
+        smtp = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=self.timeout_sec)
+        try:
             smtp.ehlo()
-        if SMTP_USERNAME:
-            smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
-        smtp.send_message(message)
-    logger.info("send_email success to=%s subject=%r", to_clean, subject)
-    return {"from_email": sender, "to_email": to_clean, "subject": subject}
+            if SMTP_USE_TLS:
+                smtp.starttls()
+                smtp.ehlo()
+            if SMTP_USERNAME:
+                smtp.login(SMTP_USERNAME, SMTP_PASSWORD)
+        except BaseException:
+            smtp.close()
+            raise
+        self._count("connects")
+        return smtp
+
+    @staticmethod
+    def _healthy(smtp: smtplib.SMTP) -> bool:
+        try:
+            return smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _discard(self, smtp: smtplib.SMTP) -> None:
+        self._count("discarded")
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                smtp, last_used = self._idle.pop()
+            idle = time.monotonic() - last_used
+            if idle > self.idle_sec:
+                self._discard(smtp)
+                continue
+            if idle > self.check_after_sec and not self._healthy(smtp):
+                self._count("health_check_failed")
+                self._discard(smtp)
+                continue
+            self._count("reused")
+            return smtp
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            smtp = self._connect()
+            outcome = "ok"
+        finally:
+            smtp_connect_seconds.observe(time.perf_counter() - start, outcome=outcome)
+        return smtp
+
+    @contextmanager
+    def connection(self) -> Iterator[smtplib.SMTP]:
+        with self._slots:
+            smtp = self._checkout()
+            try:
+                yield smtp
+            except BaseException:
+                self._discard(smtp)
+                raise
+            with self._lock:
+                self._idle.append((smtp, time.monotonic()))
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for smtp, _ in idle:
+            self._discard(smtp)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {**self._stats, "idle": len(self._idle)}
+
+
+smtp_pool = SmtpPool()
+
+
+def _deliver(messages: list[EmailMessage]) -> list[BaseException | None]:
+    """
+    Send messages in order over one pooled session; one result per message.
+
+    A rejected message (refused recipient, data error) is reset and the
+    session continues; a broken session fails the remaining messages.
+    """
+    results: list[BaseException | None] = []
+    try:
+        with smtp_pool.connection() as smtp:
+            for message in messages:
+                start = time.perf_counter()
+                outcome = "error"
+                try:
+                    smtp.send_message(message)
+                    outcome = "sent"
+                except (
+                    smtplib.SMTPRecipientsRefused,
+                    smtplib.SMTPSenderRefused,
+                    smtplib.SMTPDataError,
+                ) as exc:
+                    outcome = "refused"
+                    results.append(exc)
+                    smtp.rset()
+                else:
+                    results.append(None)
+                finally:
+                    smtp_send_seconds.observe(
+                        time.perf_counter() - start, outcome=outcome
+                    )
+    except (smtplib.SMTPException, OSError) as exc:
+        logger.warning("smtp session failed error=%r sent=%d", exc, len(results))
+        results.extend([exc] * (len(messages) - len(results)))
+    return results
+
+
+def _deliver_with_retries(messages: list[EmailMessage]) -> list[BaseException | None]:
+    results = _deliver(messages)
+    for attempt in range(1, SMTP_MAX_RETRIES + 1):
+        retry = [
+            index
+            for index, result in enumerate(results)
+            if result is not None and _is_transient(result)
+        ]
+        if not retry:
+            break
+        delay = _retry_delay(attempt)
+        retries_total.inc(len(retry), component="smtp")
+        logger.warning(
+            "smtp retry messages=%d attempt=%d retry_in_sec=%.2f",
+            len(retry),
+            attempt,
+            delay,
+        )
+        time.sleep(delay)
+        for index, result in zip(retry, _deliver([messages[i] for i in retry])):
+            results[index] = result
+    _count_rejections(results)
+    return results
+
+
+def _count_rejections(results: list[BaseException | None]) -> None:
+    """Count final failures: permanent refusals and transient errors out of retries."""
+    for result in results:
+        if result is not None:
+            reason = "retries_exhausted" if _is_transient(result) else "permanent"
+            rejections_total.inc(component="smtp", reason=reason)
+
+
+def _delivery_record(message: EmailMessage) -> dict[str, str]:
+    return {
+        "from_email": str(message["From"]),
+        "to_email": str(message["To"]),
+        "subject": str(message["Subject"]),
+    }
+
+
+def send_email(to_email: str, subject: str, body: str) -> dict[str, str]:
+    """Send plain-text email over a pooled SMTP session, retrying transient errors."""
+    message = _build_message(to_email, subject, body)
+    logger.info("send_email start to=%s", message["To"])
+    error = _deliver_with_retries([message])[0]
+    if error is not None:
+        raise error
+    logger.info("send_email success to=%s subject=%r", message["To"], subject)
+    return _delivery_record(message)
+
+
+def send_bulk(items: list[dict[str, str]]) -> list[dict[str, str]]:
+    """
+    Send many {"to_email", "subject", "body"} messages over one session.
+
+    Returns one record per item, in order, with "status" "sent" or "failed"
+    (plus "error"); invalid items fail without affecting the others.
+    """
+    records: list[dict[str, str]] = []
+    messages: list[EmailMessage] = []
+    positions: list[int] = []
+    for item in items:
+        try:
+            message = _build_message(
+                item.get("to_email", ""), item.get("subject", ""), item.get("body", "")
+            )
+        except RuntimeError as exc:
+            records.append(
+                {
+                    "to_email": item.get("to_email", ""),
+                    "subject": item.get("subject", ""),
+                    "status": "failed",
+                    "error": str(exc),
+                }
+            )
+            continue
+        positions.append(len(records))
+        records.append({**_delivery_record(message), "status": "sent"})
+        messages.append(message)
+    for position, error in zip(positions, _deliver_with_retries(messages)):
+        if error is not None:
+            records[position].update(status="failed", error=repr(error))
+    logger.info(
+        "send_bulk done messages=%d failed=%d",
+        len(records),
+        sum(1 for record in records if record["status"] == "failed"),
+    )
+    return records
+
+
+class MailQueue:
+    """
+    Background sender for queued messages.
+
+    Workers drain up to `batch` queued messages at a time and send them over
+    one pooled session. Transient failures are re-queued with jittered
+    exponential backoff, up to SMTP_MAX_RETRIES times.
+    """
+
+    def __init__(
+        self, workers: int = MAIL_QUEUE_WORKERS, batch: int = MAIL_QUEUE_BATCH
+    ) -> None:
+        self.workers = max(1, workers)
+        self.batch = max(1, batch)
+        self._queue: queue.Queue[str] = queue.Queue()
+        self._lock = threading.Lock()
+        self._deliveries: dict[str, dict[str, Any]] = {}
+        self._messages: dict[str, EmailMessage] = {}
+        self._threads: list[threading.Thread] = []
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"mail-queue-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - DELIVERY_RETENTION_SEC
+        for delivery_id, delivery in list(self._deliveries.items()):
+            if 0 < delivery["finished_at"] < cutoff:
+                del self._deliveries[delivery_id]
+
+    def enqueue(self, to_email: str, subject: str, body: str) -> dict[str, Any]:
+        """Validate and queue a message; returns its delivery record."""
+        message = _build_message(to_email, subject, body)
+        delivery_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            self._deliveries[delivery_id] = {
+                "delivery_id": delivery_id,
+                **_delivery_record(message),
+                "status": "queued",
+                "attempts": 0,
+                "error": "",
+                "finished_at": 0.0,
+            }
+            self._messages[delivery_id] = message
+            record = dict(self._deliveries[delivery_id])
+        self._start()
+        self._queue.put(delivery_id)
+        logger.info(
+            "mail_queue enqueued delivery_id=%s to=%s", delivery_id, message["To"]
+        )
+        return record
+
+    def _take_batch(self) -> list[str]:
+        batch = [self._queue.get()]
+        while len(batch) < self.batch:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            settled: set[str] = set()
+            # A worker that dies leaves the queue undrained, so anything
+            # unexpected fails the unsettled part of the batch instead.
+            try:
+                with self._lock:
+                    messages = [self._messages[delivery_id] for delivery_id in batch]
+                    for delivery_id in batch:
+                        self._deliveries[delivery_id]["status"] = "sending"
+                results = _deliver(messages)
+                for delivery_id, error in zip(batch, results):
+                    self._settle(delivery_id, error)
+                    settled.add(delivery_id)
+            except Exception as exc:
+                logger.exception("mail_queue batch failed deliveries=%d", len(batch))
+                for delivery_id in batch:
+                    if delivery_id not in settled:
+                        self._fail(delivery_id, exc)
+
+    def _fail(self, delivery_id: str, error: BaseException) -> None:
+        with self._lock:
+            delivery = self._deliveries.get(delivery_id)
+            if delivery is None:
+                return
+            delivery["status"] = "failed"
+            delivery["error"] = repr(error)
+            delivery["finished_at"] = time.time()
+            self._messages.pop(delivery_id, None)
+        rejections_total.inc(component="smtp", reason="error")
+
+    def _settle(self, delivery_id: str, error: BaseException | None) -> None:
+        with self._lock:
+            delivery = self._deliveries[delivery_id]
+            delivery["attempts"] += 1
+            attempts = delivery["attempts"]
+            retryable = error is not None and _is_transient(error)
+            if not retryable or attempts > SMTP_MAX_RETRIES:
+                delivery["status"] = "sent" if error is None else "failed"
+                delivery["error"] = "" if error is None else repr(error)
+                delivery["finished_at"] = time.time()
+                self._messages.pop(delivery_id, None)
+                retry_in = None
+                if error is not None:
+                    _count_rejections([error])
+            else:
+                delivery["status"] = "retrying"
+                delivery["error"] = repr(error)
+                retry_in = _retry_delay(attempts)
+        if retry_in is None:
+            logger.info(
+                "mail_queue %s delivery_id=%s attempts=%d",
+                "sent" if error is None else "failed",
+                delivery_id,
+                attempts,
+            )
+            return
+        logger.warning(
+            "mail_queue retry delivery_id=%s attempt=%d retry_in_sec=%.2f",
+            delivery_id,
+            attempts,
+            retry_in,
+        )
+        retries_total.inc(component="smtp")
+        timer = threading.Timer(retry_in, self._queue.put, (delivery_id,))
+        timer.daemon = True
+        timer.start()
+
+    def status(self, delivery_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            delivery = self._deliveries.get(delivery_id)
+            return dict(delivery) if delivery else None
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            counts: dict[str, int] = {}
+            for delivery in self._deliveries.values():
+                counts[delivery["status"]] = counts.get(delivery["status"], 0) + 1
+        return {**counts, "queue_depth": self._queue.qsize()}
+
 
+mail_queue = MailQueue()
@@ -0,0 +1,147 @@
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from .config import (
+    PROVIDER_BREAKER_COOLDOWN_SEC,
+    PROVIDER_BREAKER_FAILURES,
+    PROVIDER_HEALTH_WINDOW,
+)
+from .logging_setup import logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """
+    Rolling health of one search provider plus its circuit breaker.
+
+    The breaker opens after `failure_threshold` consecutive failures. Once
+    `cooldown_sec` has passed, one trial call is allowed (half-open): success
+    closes the breaker, failure reopens it for another cooldown.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = PROVIDER_HEALTH_WINDOW,
+        failure_threshold: int = PROVIDER_BREAKER_FAILURES,
+        cooldown_sec: float = PROVIDER_BREAKER_COOLDOWN_SEC,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown_sec = cooldown_sec
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.skipped = 0
+        self._trial_in_flight = False
+        # (ok, latency_ms, result_count) per call, newest last.
+        self._calls: deque[tuple[bool, float, int]] = deque(maxlen=max(1, window))
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; claims the half-open trial slot."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.cooldown_sec:
+                    self.skipped += 1
+                    return False
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN:
+                if self._trial_in_flight:
+                    self.skipped += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record(self, ok: bool, latency_ms: float, result_count: int = 0) -> None:
+        with self._lock:
+            self._calls.append((ok, latency_ms, result_count))
+            self._trial_in_flight = False
+            if ok:
+                if self.state != CLOSED:
+                    logger.info("provider=%s breaker closed", self.name)
+                self.state = CLOSED
+                self.consecutive_failures = 0
+                return
+            self.consecutive_failures += 1
+            if (
+                self.state == HALF_OPEN
+                or self.consecutive_failures >= self.failure_threshold
+            ):
+                if self.state != OPEN:
+                    logger.warning(
+                        "provider=%s breaker opened consecutive_failures=%d "
+                        "cooldown_sec=%.1f",
+                        self.name,
+                        self.consecutive_failures,
+                        self.cooldown_sec,
+                    )
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def rank_key(self) -> tuple[float, float, float]:
+        """Sort key: fewer errors first, then more results, then lower latency."""
+        with self._lock:
+            calls = list(self._calls)
+        if not calls:
+            return (0.0, 0.0, 0.0)
+        error_rate = sum(1 for ok, _, _ in calls if not ok) / len(calls)
+        mean_yield = sum(count for _, _, count in calls) / len(calls)
+        mean_latency = sum(latency for _, latency, _ in calls) / len(calls)
+        return (round(error_rate, 1), -mean_yield, mean_latency)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            calls = list(self._calls)
+            state = self.state
+            consecutive = self.consecutive_failures
+            skipped = self.skipped
+            retry_in = (
+                max(0.0, self.cooldown_sec - (time.monotonic() - self.opened_at))
+                if state == OPEN
+                else 0.0
+            )
+        latencies = sorted(latency for _, latency, _ in calls)
+
+        def pct(q: float) -> float:
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(q * len(latencies)))], 1)
+
+        total = len(calls)
+        return {
+            "state": state,
+            "calls": total,
+            "error_rate": round(sum(1 for ok, _, _ in calls if not ok) / total, 3)
+            if total
+            else 0.0,
+            "mean_results": round(sum(count for _, _, count in calls) / total, 2)
+            if total
+            else 0.0,
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95)},
+            "consecutive_failures": consecutive,
+            "skipped": skipped,
+            "retry_in_sec": round(retry_in, 1),
+        }
+
+
+class ProviderRegistry:
+    """Health for every search provider, used to order and skip them."""
+
+    def __init__(self, names: list[str]) -> None:
+        self.providers = {name: ProviderHealth(name) for name in names}
+
+    def get(self, name: str) -> ProviderHealth:
+        return self.providers[name]
+
+    def ordered(self, names: list[str]) -> list[str]:
+        """Names sorted by observed performance; stable for ties."""
+        return sorted(names, key=lambda name: self.providers[name].rank_key())
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: health.stats() for name, health in self.providers.items()}
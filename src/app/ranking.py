@@ -0,0 +1,27 @@
+from urllib.parse import urlparse
+
+FOUNDER_KEYWORDS = ["founder", "co-founder", "founded", "founding", "ceo"]
+
+
+def domain_priority(url: str) -> int:
+    """Source rank for founder evidence: 0 unravel.tech, 1 LinkedIn, 2 X, 3 other."""
+    domain = urlparse(url).netloc.lower()
+    if "unravel.tech" in domain:
+        return 0
+    if "linkedin.com" in domain:
+        return 1
+    if "x.com" in domain or "twitter.com" in domain:
+        return 2
+    return 3
+
+
+def extract_founder_excerpt(text: str) -> str:
+    """Return a compact segment around founder-related keywords."""
+    lowered = text.lower()
+    for keyword in FOUNDER_KEYWORDS:
+        idx = lowered.find(keyword)
+        if idx != -1:
+            start = max(0, idx - 350)
+            end = min(len(text), idx + 950)
+            return text[start:end]
+    return text[:1200]
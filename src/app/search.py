@@ -1,28 +1,50 @@
-import re
+import threading
 import time
-from html import unescape
-from urllib.parse import urlparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any
 
 import requests
 from ddgs import DDGS
 
+from .cache import SqliteCache
 from .config import (
+    CACHE_DB_PATH,
+    EVIDENCE_SUFFICIENT_HITS,
+    EVIDENCE_TOKEN_BUDGET,
     MAX_FETCH_PAGES,
     REQUEST_TIMEOUT_SEC,
+    SEARCH_ADAPTIVE_PLAN,
+    SEARCH_CACHE_ENABLED,
+    SEARCH_CACHE_MAX_ENTRIES,
+    SEARCH_CACHE_TTL_SEC,
+    SEARCH_FANOUT_POLICY,
+    SEARCH_PROVIDER_CONCURRENCY,
+    SEARCH_PROVIDER_DEADLINE_SEC,
+    SEARCH_QUERY_WORKERS,
+    SEARCH_STAGE_FETCH_PAGES,
     SERPER_API_KEY,
     TAVILY_API_KEY,
 )
+from .dedupe import PageDeduper, canonical_url
+from .evidence import build_passages, evidence_sufficiency, pack_evidence
+from .fetcher import fetch_pages
 from .logging_setup import logger
+from .metrics import rejections_total, search_provider_seconds
+from .providers import ProviderRegistry
+from .ranking import domain_priority
+from .singleflight import SingleFlight
+from .tokens import estimate_tokens
 
 
 def _dedupe_results(results: list[dict[str, str]]) -> list[dict[str, str]]:
+    """Drop results whose URL canonicalizes to one already seen; keeps the first."""
     seen: set[str] = set()
     deduped: list[dict[str, str]] = []
     for item in results:
-        url = (item.get("url") or "").strip()
-        if not url or url in seen:
+        key = canonical_url(item.get("url") or "")
+        if not key or key in seen:
             continue
-        seen.add(url)
+        seen.add(key)
         deduped.append(item)
     return deduped
 
@@ -101,40 +123,210 @@ def _search_ddg(query: str, max_results: int) -> list[dict[str, str]]:
     ]
 
 
-def search_web(query: str, max_results: int = 6) -> list[dict[str, str]]:
-    """Search using Serper/Tavily when available, with DDG fallback."""
+PROVIDER_CALLS = [
+    ("serper", _search_serper),
+    ("tavily", _search_tavily),
+    ("ddg", _search_ddg),
+]
+FANOUT_POLICIES = {"all", "enough", "deadline", "sequential"}
+
+# One pool per provider, sized to its concurrency cap and shared across
+# queries, so calls queued behind a saturated provider never hold workers
+# another provider needs. Providers abandoned by an early return finish here
+# in the background instead of blocking the caller.
+_provider_pools = {
+    provider_name: ThreadPoolExecutor(
+        max_workers=SEARCH_PROVIDER_CONCURRENCY.get(provider_name, 2),
+        thread_name_prefix=f"search-{provider_name}",
+    )
+    for provider_name, _ in PROVIDER_CALLS
+}
+_query_pool = ThreadPoolExecutor(
+    max_workers=SEARCH_QUERY_WORKERS, thread_name_prefix="search-query"
+)
+provider_registry = ProviderRegistry([name for name, _ in PROVIDER_CALLS])
+# Concurrent pipeline runs share in-flight provider searches and evidence builds.
+search_flight = SingleFlight("search")
+evidence_flight = SingleFlight("evidence")
+search_cache = SqliteCache(
+    "search_results",
+    CACHE_DB_PATH,
+    ttl_sec=SEARCH_CACHE_TTL_SEC,
+    max_entries=SEARCH_CACHE_MAX_ENTRIES,
+)
+
+
+def _search_cache_key(provider_name: str, query: str, max_results: int) -> str:
+    normalized_query = " ".join(query.lower().split())
+    return f"{provider_name}|{normalized_query}|{max_results}"
+
+
+def _run_provider(
+    provider_name: str, provider_fn, query: str, max_results: int
+) -> list[dict[str, str]]:
+    cache_key = _search_cache_key(provider_name, query, max_results)
+    if SEARCH_CACHE_ENABLED:
+        cached = search_cache.get(cache_key)
+        if cached is not None:
+            logger.info(
+                "search_web provider=%s cache_hit results=%d",
+                provider_name,
+                len(cached),
+            )
+            return cached
+    health = provider_registry.get(provider_name)
+    if not health.allow():
+        logger.info("search_web provider=%s skipped breaker=open", provider_name)
+        rejections_total.inc(component="search_provider", reason="breaker_open")
+        return []
     start = time.perf_counter()
+    try:
+        provider_results = provider_fn(query, max_results)
+    except Exception:
+        elapsed = time.perf_counter() - start
+        health.record(False, elapsed * 1000)
+        search_provider_seconds.observe(
+            elapsed, provider=provider_name, outcome="error"
+        )
+        logger.exception("search_web provider=%s failed", provider_name)
+        return []
+    elapsed = time.perf_counter() - start
+    health.record(True, elapsed * 1000, len(provider_results))
+    search_provider_seconds.observe(
+        elapsed,
+        provider=provider_name,
+        outcome="ok" if provider_results else "empty",
+    )
+    logger.info(
+        "search_web provider=%s results=%d", provider_name, len(provider_results)
+    )
+    # Empty answers are usually a missing key or a transient miss; not cached.
+    if SEARCH_CACHE_ENABLED and provider_results:
+        search_cache.set(cache_key, provider_results)
+    return provider_results
+
+
+def _collect_done(futures: dict[str, Future]) -> list[dict[str, str]]:
+    """Combine finished provider results in the (ranked) order of `futures`."""
+    combined: list[dict[str, str]] = []
+    for future in futures.values():
+        if future.done():
+            combined.extend(future.result())
+    return combined
+
+
+def _provider_configured(provider_name: str) -> bool:
+    """Whether the provider has its API key; DDG needs none."""
+    if provider_name == "serper":
+        return bool(SERPER_API_KEY)
+    if provider_name == "tavily":
+        return bool(TAVILY_API_KEY)
+    return True
+
+
+def _ranked_providers() -> list[tuple[str, Any]]:
+    """
+    Configured PROVIDER_CALLS ordered by observed health, best first.
+
+    Providers without an API key are left out entirely, so they are neither
+    called nor recorded as healthy in provider_registry.
+    """
+    calls = {name: fn for name, fn in PROVIDER_CALLS if _provider_configured(name)}
+    return [(name, calls[name]) for name in provider_registry.ordered(list(calls))]
+
+
+def _fan_out(query: str, max_results: int, policy: str) -> list[dict[str, str]]:
+    """Run all providers concurrently and stop according to the completion policy."""
+    futures = {
+        provider_name: _provider_pools[provider_name].submit(
+            _run_provider, provider_name, provider_fn, query, max_results
+        )
+        for provider_name, provider_fn in _ranked_providers()
+    }
+    deadline = (
+        time.monotonic() + SEARCH_PROVIDER_DEADLINE_SEC
+        if policy == "deadline"
+        else None
+    )
+    pending = set(futures.values())
+    while pending:
+        timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            logger.warning(
+                "search_web deadline_exceeded query=%r pending=%s",
+                query,
+                [name for name, future in futures.items() if not future.done()],
+            )
+            break
+        if policy == "enough" and pending:
+            unique = _dedupe_results(_collect_done(futures))
+            if len(unique) >= max_results:
+                logger.info(
+                    "search_web early_return query=%r pending=%d", query, len(pending)
+                )
+                break
+    return _collect_done(futures)
+
+
+def search_web(
+    query: str, max_results: int = 6, policy: str | None = None
+) -> list[dict[str, str]]:
+    """
+    Search using Serper/Tavily when available, with DDG fallback.
+
+    Providers run concurrently; `policy` (default SEARCH_FANOUT_POLICY) picks
+    when to return: "all" waits for every provider, "enough" returns once
+    max_results unique URLs are in hand, "deadline" returns whatever arrived
+    within SEARCH_PROVIDER_DEADLINE_SEC, and "sequential" keeps the old
+    one-after-another behaviour. Providers are tried best-first by observed
+    health, and ones with an open circuit breaker are skipped.
+    """
     cleaned_query = (query or "").strip()
     safe_max_results = max(1, min(int(max_results or 6), 10))
+    fanout_policy = (policy or SEARCH_FANOUT_POLICY).strip().lower()
+    if fanout_policy not in FANOUT_POLICIES:
+        logger.warning("search_web unknown_policy=%r using=all", fanout_policy)
+        fanout_policy = "all"
 
     if not cleaned_query:
         logger.warning("search_web called with empty query")
         return []
 
+    flight_key = (
+        f"{fanout_policy}|{safe_max_results}|{' '.join(cleaned_query.lower().split())}"
+    )
+    return list(
+        search_flight.do(
+            flight_key, _search_providers, cleaned_query, safe_max_results, fanout_policy
+        )
+    )
+
+
+def _search_providers(
+    cleaned_query: str, safe_max_results: int, fanout_policy: str
+) -> list[dict[str, str]]:
+    start = time.perf_counter()
     logger.info(
-        "search_web start query=%r max_results=%d",
+        "search_web start query=%r max_results=%d policy=%s",
         cleaned_query,
         safe_max_results,
+        fanout_policy,
     )
     try:
-        provider_calls = [
-            ("serper", _search_serper),
-            ("tavily", _search_tavily),
-            ("ddg", _search_ddg),
-        ]
-        combined: list[dict[str, str]] = []
-        for provider_name, provider_fn in provider_calls:
-            try:
-                provider_results = provider_fn(cleaned_query, safe_max_results)
-                logger.info(
-                    "search_web provider=%s results=%d",
+        if fanout_policy == "sequential":
+            combined: list[dict[str, str]] = []
+            for provider_name, provider_fn in _ranked_providers():
+                future = _provider_pools[provider_name].submit(
+                    _run_provider,
                     provider_name,
-                    len(provider_results),
+                    provider_fn,
+                    cleaned_query,
+                    safe_max_results,
                 )
-                combined.extend(provider_results)
-            except Exception:
-                logger.exception("search_web provider=%s failed", provider_name)
-                continue
+                combined.extend(future.result())
+        else:
+            combined = _fan_out(cleaned_query, safe_max_results, fanout_policy)
         results = _dedupe_results(combined)[:safe_max_results]
         logger.info(
             "search_web done query=%r results=%d total_duration_ms=%.1f",
@@ -152,6 +344,22 @@ def search_web(query: str, max_results: int = 6) -> list[dict[str, str]]:
         return []
 
 
+def run_query_plan(
+    queries: list[str], max_results: int = 8
+) -> list[list[dict[str, str]]]:
+    """Run search_web for every query concurrently; results keep query order."""
+    start = time.perf_counter()
+    plan_results = list(
+        _query_pool.map(lambda query: search_web(query, max_results), queries)
+    )
+    logger.info(
+        "run_query_plan done queries=%d total_duration_ms=%.1f",
+        len(queries),
+        (time.perf_counter() - start) * 1000,
+    )
+    return plan_results
+
+
 def web_search(query: str, max_results: int = 6) -> str:
     """Compatibility formatter over search_web()."""
     results = search_web(query=query, max_results=max_results)
@@ -166,135 +374,158 @@ def web_search(query: str, max_results: int = 6) -> str:
     return "\n".join(lines)
 
 
-def _domain_priority(url: str) -> int:
-    domain = urlparse(url).netloc.lower()
-    if "unravel.tech" in domain:
-        return 0
-    if "linkedin.com" in domain:
-        return 1
-    if "x.com" in domain or "twitter.com" in domain:
-        return 2
-    return 3
+# Query stages in priority order. The adaptive plan stops after the first
+# stage whose evidence is sufficient (see evidence_sufficiency).
+QUERY_STAGES = [
+    [
+        "site:unravel.tech founder",
+        "Unravel.tech founders startup founded in 2023",
+    ],
+    [
+        "site:linkedin.com/company unravel.tech founders",
+        "site:linkedin.com/in unravel tech founder",
+    ],
+    ["Unravel.tech AI startup founder profile"],
+]
+SEED_URLS = [
+    "https://unravel.tech/",
+    "https://unravel.tech/about",
+]
+_plan_stats = {
+    "runs": 0,
+    "early_stops": 0,
+    "queries_run": 0,
+    "queries_skipped": 0,
+    "pages_fetched": 0,
+    "duplicate_pages": 0,
+}
+_plan_stats_lock = threading.Lock()
+
+
+def collect_search_context() -> str:
+    """Run multi-provider search, fetch top pages, and build evidence context."""
+    return collect_search_evidence()["context"]
 
 
-def _extract_text_from_html(html: str) -> str:
-    cleaned = re.sub(r"(?is)<(script|style|noscript).*?>.*?</\1>", " ", html)
-    cleaned = re.sub(r"(?is)<[^>]+>", " ", cleaned)
-    cleaned = unescape(cleaned)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
-    return cleaned
+def collect_search_evidence() -> dict:
+    """
+    Run the search/fetch pipeline and pack the evidence for the prompt.
 
+    Query stages run in priority order, each followed by a bounded batch of
+    page fetches; with SEARCH_ADAPTIVE_PLAN the plan stops as soon as the
+    evidence is sufficient.
 
-def fetch_page_text(url: str) -> str:
-    """Fetch and clean page text. Returns empty string if unavailable."""
-    logger.info("fetch_page_text start url=%s", url)
-    try:
-        response = requests.get(
-            url,
-            headers={
-                "User-Agent": (
-                    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                    "AppleWebKit/537.36 (KHTML, like Gecko) "
-                    "Chrome/122.0.0.0 Safari/537.36"
-                )
-            },
-            timeout=REQUEST_TIMEOUT_SEC,
-        )
-        response.raise_for_status()
-        content_type = (response.headers.get("Content-Type") or "").lower()
-        if "text/html" not in content_type:
-            logger.info(
-                "fetch_page_text skipped_non_html url=%s content_type=%s",
-                url,
-                content_type,
-            )
-            return ""
-        text = _extract_text_from_html(response.text)
-        if not text:
-            return ""
-        logger.info("fetch_page_text done url=%s chars=%d", url, len(text))
-        return text[:6000]
-    except Exception:
-        logger.exception("fetch_page_text failed url=%s", url)
-        return ""
+    Returns {"context": packed evidence text, "passages": all scored candidate
+    passages}. Concurrent callers attach to one in-flight build.
+    """
+    return evidence_flight.do("unravel", _build_search_evidence)
 
 
-def _extract_founder_excerpt(text: str) -> str:
-    """Return a compact segment around founder-related keywords."""
-    lowered = text.lower()
-    keywords = ["founder", "co-founder", "founded", "founding", "ceo"]
-    for keyword in keywords:
-        idx = lowered.find(keyword)
-        if idx != -1:
-            start = max(0, idx - 350)
-            end = min(len(text), idx + 950)
-            return text[start:end]
-    return text[:1200]
+def query_plan_stats() -> dict[str, int]:
+    """How far evidence builds went through QUERY_STAGES, and what they skipped."""
+    with _plan_stats_lock:
+        return dict(_plan_stats)
 
 
-def collect_search_context() -> str:
-    """Run multi-provider search, fetch top pages, and build evidence context."""
-    queries = [
-        "Unravel.tech founders startup founded in 2023",
-        "site:unravel.tech founder",
-        "site:linkedin.com/company unravel.tech founders",
-        "site:linkedin.com/in unravel tech founder",
-        "Unravel.tech AI startup founder profile",
-    ]
-    chunks = []
-    all_results: list[dict[str, str]] = []
-
-    for idx, query in enumerate(queries, 1):
-        logger.info("collect_search_context query_%d=%r", idx, query)
-        results = search_web(query=query, max_results=8)
-        all_results.extend(results)
-        if not results:
-            chunks.append(f"Search Query {idx}: {query}\nNo results found.")
-            continue
-        lines = []
-        for rank, item in enumerate(results, 1):
-            lines.append(
-                f"[{rank}] ({item.get('provider', 'unknown')}) {item.get('title', '')}\n"
-                f"    URL: {item.get('url', '')}\n"
-                f"    {item.get('snippet', '')}"
-            )
-        chunks.append(f"Search Query {idx}: {query}\n" + "\n".join(lines))
+def _count_plan(**deltas: int) -> None:
+    with _plan_stats_lock:
+        for key, delta in deltas.items():
+            _plan_stats[key] += delta
+
 
-    seed_urls = [
-        "https://unravel.tech/",
-        "https://www.unravel.tech/",
-        "https://unravel.tech/about",
-        "https://www.unravel.tech/about",
+def _build_search_evidence() -> dict:
+    adaptive = SEARCH_ADAPTIVE_PLAN
+    if adaptive:
+        stages = QUERY_STAGES
+    else:
+        stages = [[query for stage in QUERY_STAGES for query in stage]]
+    stage_fetch_pages = SEARCH_STAGE_FETCH_PAGES if adaptive else MAX_FETCH_PAGES
+    seeds = [
+        {"title": "Seed URL", "url": url, "snippet": "", "provider": "seed"}
+        for url in SEED_URLS
     ]
-    for url in seed_urls:
-        all_results.append(
-            {"title": "Seed URL", "url": url, "snippet": "", "provider": "seed"}
+    search_results: list[dict[str, str]] = []
+    pages: list[dict[str, str]] = []
+    passages: list[dict] = []
+    fetched: set[str] = set()
+    deduper = PageDeduper()
+    duplicate_pages = 0
+    queries_run = 0
+    sufficient = False
+
+    for stage_index, queries in enumerate(stages, 1):
+        for query in queries:
+            logger.info("collect_search_context stage=%d query=%r", stage_index, query)
+        for results in run_query_plan(queries, max_results=8):
+            search_results.extend(results)
+        queries_run += len(queries)
+        search_results = _dedupe_results(search_results)
+
+        candidates = [
+            item
+            for item in _dedupe_results(search_results + seeds)
+            if canonical_url(item["url"]) not in fetched
+        ]
+        candidates.sort(key=lambda item: domain_priority(item.get("url", "")))
+        fetch_budget = min(stage_fetch_pages, MAX_FETCH_PAGES - len(fetched))
+        batch = candidates[: max(0, fetch_budget)]
+        titles = {item["url"]: item.get("title", "") for item in batch}
+        fetched.update(canonical_url(url) for url in titles)
+        for page in fetch_pages(list(titles)) if titles else []:
+            if not page["text"]:
+                continue
+            duplicate_of = deduper.duplicate_of(page["url"], page["text"])
+            if duplicate_of:
+                logger.info(
+                    "collect_search_context duplicate_page url=%s duplicate_of=%s",
+                    page["url"],
+                    duplicate_of,
+                )
+                duplicate_pages += 1
+                continue
+            pages.append({**page, "title": titles.get(page["url"], "")})
+
+        passages = build_passages(search_results, pages)
+        hits = evidence_sufficiency(passages)
+        sufficient = hits >= EVIDENCE_SUFFICIENT_HITS
+        logger.info(
+            "collect_search_context stage=%d search_results=%d fetched_urls=%d "
+            "priority_hits=%d sufficient=%s",
+            stage_index,
+            len(search_results),
+            len(fetched),
+            hits,
+            sufficient,
         )
+        if adaptive and sufficient and stage_index < len(stages):
+            logger.info(
+                "collect_search_context early_stop stage=%d skipped_queries=%d",
+                stage_index,
+                sum(len(stage) for stage in stages) - queries_run,
+            )
+            break
+
+    total_queries = sum(len(stage) for stage in stages)
+    _count_plan(
+        runs=1,
+        early_stops=int(queries_run < total_queries),
+        queries_run=queries_run,
+        queries_skipped=total_queries - queries_run,
+        pages_fetched=len(fetched),
+        duplicate_pages=duplicate_pages,
+    )
 
-    deduped = _dedupe_results(all_results)
-    deduped.sort(key=lambda item: _domain_priority(item.get("url", "")))
-    top_results = deduped[:MAX_FETCH_PAGES]
+    packed = pack_evidence(passages, EVIDENCE_TOKEN_BUDGET)
+    context = (
+        "Evidence passages (search snippets and fetched pages):\n" + packed
+        if packed
+        else "No evidence found."
+    )
     logger.info(
-        "collect_search_context unique_urls=%d fetched_urls=%d",
-        len(deduped),
-        len(top_results),
+        "collect_search_context passages=%d pages=%d context_tokens=%d budget=%d",
+        len(passages),
+        len(pages),
+        estimate_tokens(context),
+        EVIDENCE_TOKEN_BUDGET,
     )
-
-    page_chunks = []
-    for item in top_results:
-        url = item.get("url", "")
-        if not url:
-            continue
-        page_text = fetch_page_text(url)
-        if not page_text:
-            continue
-        excerpt = _extract_founder_excerpt(page_text)
-        page_chunks.append(
-            f"URL: {url}\nTitle: {item.get('title', '')}\nExcerpt:\n{excerpt}\n"
-        )
-
-    if page_chunks:
-        chunks.append("Fetched Page Evidence:\n" + "\n".join(page_chunks))
-
-    return "\n\n".join(chunks)
-
+    return {"context": context, "passages": passages}